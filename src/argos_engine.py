@@ -0,0 +1,148 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+TO_ARGOS_LANG = {'fre': 'fr',
+                 'ger': 'de',
+                 'ita': 'it'}
+
+BATCH_SIZE = 32
+BEAM_SIZE = 4
+WORKERS = 1
+
+# Threads used by each CTranslate2 translator loaded in this process, 0 for its default
+THREADS = 0
+# Pools of processes translating each language, kept across calls so that their models are loaded only once
+EXECUTORS = {}
+
+
+def get_argos_package(lang: str):
+    """
+    Get the installed Argos package translating from a language to english
+    :param lang: source language, as in the items
+    :return: the package
+    """
+    from argostranslate import package
+    for pkg in package.get_installed_packages():
+        if pkg.from_code == TO_ARGOS_LANG[lang] and pkg.to_code == "en":
+            return pkg
+    raise ValueError(f"No Argos package installed from {lang} to english")
+
+
+def load_engine(lang: str) -> dict:
+    """
+    Get the translation models of the Argos package of a language, loaded once per process by models.get_model: the
+    CTranslate2 translator and the SentencePiece tokenizer
+    :param lang: source language, as in the items
+    :return: dict with the loaded models
+    """
+    from models import get_model
+    return get_model(f"argos_engine_{lang}")
+
+
+def load_splitter(lang: str):
+    """
+    Get the Stanza sentence splitter of the Argos package of a language, loaded once per process by models.get_model
+    :param lang: source language, as in the items
+    :return: the loaded splitter
+    """
+    from models import get_model
+    return get_model(f"argos_splitter_{lang}")
+
+
+def init_worker(lang: str, threads: int):
+    """
+    Load the translation models of a language in a process of a pool, sharing the cores between the processes
+    :param lang: source language, as in the items
+    :param threads: threads used by CTranslate2 in this process
+    """
+    global THREADS
+    THREADS = threads
+    load_engine(lang)
+
+
+def get_executor(lang: str, workers: int) -> ProcessPoolExecutor:
+    """
+    Get the pool of processes translating a language, starting it on first use. Each process loads the translation
+    models once and keeps them for all the following calls
+    :param lang: source language
+    :param workers: number of processes
+    :return: the pool of processes
+    """
+    if (lang, workers) not in EXECUTORS:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        EXECUTORS[(lang, workers)] = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(lang, threads))
+    return EXECUTORS[(lang, workers)]
+
+
+def close_executors():
+    """
+    Stop the pools of processes translating, releasing their models
+    """
+    for executor in EXECUTORS.values():
+        executor.shutdown()
+    EXECUTORS.clear()
+
+
+def split_sentences(splitter, text: str) -> list[list[str]]:
+    """
+    Split a text in paragraphs and each paragraph in sentences, as Argos does before translating
+    :param splitter: sentence splitter of the text language
+    :param text: text to be split
+    :return: list of paragraphs, each being a list of sentences
+    """
+    paragraphs = []
+    for paragraph in text.split("\n"):
+        if paragraph.strip() == "":
+            paragraphs.append([])
+            continue
+        paragraphs.append([sentence.text for sentence in splitter(paragraph).sentences])
+    return paragraphs
+
+
+def translate_batch(lang: str, sentences: list[str]) -> list[str]:
+    """
+    Translate a batch of sentences with one CTranslate2 call
+    :param lang: source language of the sentences
+    :param sentences: sentences to be translated
+    :return: translation of each sentence
+    """
+    engine = load_engine(lang)
+    tokenized = engine["tokenizer"].encode(sentences, out_type=str)
+    results = engine["translator"].translate_batch(tokenized, max_batch_size=BATCH_SIZE, beam_size=BEAM_SIZE,
+                                                   replace_unknowns=True)
+    return engine["tokenizer"].decode([result.hypotheses[0] for result in results])
+
+
+def translate_texts(lang: str, texts: list[str], workers: int = None) -> list[str]:
+    """
+    Translate many texts at once: their sentences are deduplicated, sorted by length so that every batch holds
+    sentences of similar length, and translated in batches, optionally by a pool of processes with one model each.
+    The pool is kept for the following calls on the same language, and this process then only loads the splitter
+    :param lang: source language of the texts
+    :param texts: texts to be translated
+    :param workers: number of processes translating, the current process only if 1. WORKERS if not given
+    :return: translation of each text
+    """
+    if workers is None:
+        workers = WORKERS
+    start = time.time()
+    splitter = load_splitter(lang)
+    texts_paragraphs = [split_sentences(splitter, text) for text in texts]
+    sentences = sorted({sentence for paragraphs in texts_paragraphs for paragraph in paragraphs
+                        for sentence in paragraph}, key=len)
+    batches = [sentences[i:i + BATCH_SIZE] for i in range(0, len(sentences), BATCH_SIZE)]
+
+    if workers > 1:
+        translated_batches = list(get_executor(lang, workers).map(translate_batch, [lang] * len(batches), batches))
+    else:
+        translated_batches = [translate_batch(lang, batch) for batch in batches]
+
+    translations = {}
+    for batch, translated_batch in zip(batches, translated_batches):
+        translations.update(zip(batch, translated_batch))
+    elapsed = time.time() - start
+    print(f"{lang}: {len(sentences)} sentences in {elapsed:.1f}s "
+          f"({len(sentences) / max(elapsed, 1e-9):.1f} segments/s)")
+    return ["\n".join(" ".join(translations[sentence] for sentence in paragraph) for paragraph in paragraphs)
+            for paragraphs in texts_paragraphs]
@@ -0,0 +1,109 @@
+import time
+import asyncio
+import httpx
+
+TO_GOOGLE_LANG = {'fre': 'fr',
+                  'ger': 'de',
+                  'ita': 'it'}
+
+# Base URL of the translation service, point it to a local stub server for testing
+BASE_URL = "https://translate.googleapis.com"
+TIMEOUT = 30
+
+# Requests in flight at the same time
+CONCURRENCY = 64
+# Token bucket: requests per second on average and maximum burst
+RATE = 10
+BURST = 20
+
+RETRIES = 5
+# Seconds waited before the first retry, doubled at each further retry
+BACKOFF = 1.0
+
+
+def parse_translation(data: list) -> str:
+    """
+    Get the translated text from a response of the service
+    :param data: JSON body of the response
+    :return: translated text, joining the translated sentences
+    """
+    return "".join(sentence[0] for sentence in data[0] if sentence[0])
+
+
+async def acquire_token(bucket: dict):
+    """
+    Wait until the token bucket allows one more request
+    :param bucket: state of the token bucket, with its tokens, when they were last refilled and its lock
+    """
+    async with bucket["lock"]:
+        while True:
+            now = time.monotonic()
+            bucket["tokens"] = min(BURST, bucket["tokens"] + (now - bucket["updated"]) * RATE)
+            bucket["updated"] = now
+            if bucket["tokens"] >= 1:
+                bucket["tokens"] -= 1
+                return
+            await asyncio.sleep((1 - bucket["tokens"]) / RATE)
+
+
+async def request_translation(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, bucket: dict, lang: str,
+                              text: str):
+    """
+    Translate one text, retrying with exponential backoff on network errors, rate limiting and server errors
+    :param client: client of the service
+    :param semaphore: bounds the requests in flight
+    :param bucket: state of the token bucket
+    :param lang: source language of the text
+    :param text: text to be translated
+    :return: the translated text, or None if all the attempts failed
+    """
+    params = {"client": "gtx", "sl": TO_GOOGLE_LANG[lang], "tl": "en", "dt": "t", "q": text}
+    async with semaphore:
+        for attempt in range(RETRIES):
+            await acquire_token(bucket)
+            try:
+                response = await client.get("/translate_a/single", params=params)
+                if response.status_code == 200:
+                    return parse_translation(response.json())
+                if response.status_code != 429 and response.status_code < 500:
+                    print(f"Translation failed with status {response.status_code}")
+                    return None
+            except (httpx.HTTPError, ValueError, IndexError, TypeError) as error:
+                print(f"Translation failed: {error!r}")
+            # There is nothing to wait for after the last attempt, and the slot is freed for other texts
+            if attempt < RETRIES - 1:
+                await asyncio.sleep(BACKOFF * 2 ** attempt)
+    return None
+
+
+async def translate_texts_async(lang: str, texts: list[str], concurrency: int) -> list:
+    """
+    Translate many texts with concurrent requests
+    :param lang: source language of the texts
+    :param texts: texts to be translated
+    :param concurrency: maximum number of requests in flight
+    :return: translation of each text, None for the failed ones
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = {"tokens": BURST, "updated": time.monotonic(), "lock": asyncio.Lock()}
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=TIMEOUT) as client:
+        return await asyncio.gather(*(request_translation(client, semaphore, bucket, lang, text) for text in texts))
+
+
+def translate_texts(lang: str, texts: list[str], concurrency: int = None) -> list:
+    """
+    Translate many texts with the service, sending each distinct text once
+    :param lang: source language of the texts
+    :param texts: texts to be translated
+    :param concurrency: maximum number of requests in flight, CONCURRENCY if not given
+    :return: translation of each text, None for the failed ones
+    """
+    if concurrency is None:
+        concurrency = CONCURRENCY
+    start = time.time()
+    unique_texts = list(dict.fromkeys(texts))
+    translations = dict(zip(unique_texts, asyncio.run(translate_texts_async(lang, unique_texts, concurrency))))
+    elapsed = time.time() - start
+    print(f"{lang}: {len(unique_texts)} segments in {elapsed:.1f}s "
+          f"({len(unique_texts) / max(elapsed, 1e-9):.1f} segments/s)")
+    return [translations[text] for text in texts]
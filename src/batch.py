@@ -0,0 +1,77 @@
+import os
+from utils import TRANSLATED_NEWS_DIR, UseCarousels
+from utils import date_to_epoch, to_out_date, get_out_path, get_originals_data, load_windows_variants
+from commonality import SnapshotEquivalents, run_one_commons, get_cardinalities_stat
+from flows import get_flows
+
+WORKING_DIR = TRANSLATED_NEWS_DIR
+
+LANGS = [lang for lang in os.listdir(WORKING_DIR)]
+
+WINDOWS = [(f"2023-11-{day} 16:15:00", f"2023-11-{day} 16:29:00") for day in range(21, 31)] + \
+          [(f"2023-12-{day} 16:15:00", f"2023-12-{day} 16:29:00") for day in range(1, 22)]
+
+ANALYSES = ["commonality", "cardinalities", "flows", "originals"]
+
+
+def main():
+    run_windows(WINDOWS)
+
+
+def run_windows(windows: list[tuple[str, str]], analyses: list[str] = None, carousels_variants: list = None,
+                simil_snapshot_fun: SnapshotEquivalents = SnapshotEquivalents.LINKED) -> list[dict]:
+    """
+    Run the analyses on several time ranges and ways of handling carousels, reading each needed snapshot only once
+    :param windows: list of starting and ending dates of the time ranges
+    :param analyses: analyses to be run, among ANALYSES. All of them if not given
+    :param carousels_variants: ways of handling carousels, all of them if not given
+    :param simil_snapshot_fun: function to use for check equivalence in the commonality analysis
+    :return: for each time range, a dictionary with the results of each way of handling carousels
+    """
+    if analyses is None:
+        analyses = ANALYSES
+    if carousels_variants is None:
+        carousels_variants = list(UseCarousels)
+    windows_epochs = [(date_to_epoch(start_date), date_to_epoch(end_date)) for start_date, end_date in windows]
+    windows_variants = load_windows_variants(WORKING_DIR, LANGS, windows_epochs)
+
+    results = []
+    for window, (start_epoch, end_epoch), variants in zip(windows, windows_epochs, windows_variants):
+        print(f"Processing {get_out_path(window)}")
+        results.append({carousels: run_analyses(window, start_epoch, end_epoch, variants[carousels], analyses,
+                                                carousels, simil_snapshot_fun)
+                        for carousels in carousels_variants})
+    return results
+
+
+def run_analyses(window: tuple[str, str], start_epoch: float, end_epoch: float, news_items: dict,
+                 analyses: list[str], carousels: UseCarousels, simil_snapshot_fun: SnapshotEquivalents) -> dict:
+    """
+    Run the analyses on the already loaded items of a time range
+    :param window: starting and ending date of the time range
+    :param start_epoch: start of the time range
+    :param end_epoch: end of the time range
+    :param news_items: items of the time range grouped by language section
+    :param analyses: analyses to be run
+    :param carousels: how carousels were handled when loading the items
+    :param simil_snapshot_fun: function to use for check equivalence in the commonality analysis
+    :return: a dictionary with the result of each analysis
+    """
+    result = {}
+    if "commonality" in analyses:
+        result["commonality"] = run_one_commons(simil_snapshot_fun, carousels=carousels, news_items=news_items,
+                                                window=window)
+    if "cardinalities" in analyses:
+        result["cardinalities"] = get_cardinalities_stat(carousels=carousels, news_items=news_items, window=window)
+    # The flows are computed from the originals, which are computed and written only once when both are run
+    if "originals" in analyses:
+        result["originals"] = get_originals_data(start_epoch, end_epoch, WORKING_DIR, carousels,
+                                                 to_out_date(window[0]), to_out_date(window[1]), items=news_items)
+    if "flows" in analyses:
+        result["flows"] = get_flows(carousels, news_items=news_items, window=window,
+                                    originals_data=result.get("originals"))
+    return result
+
+
+if __name__ == "__main__":
+    main()
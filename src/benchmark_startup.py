@@ -0,0 +1,58 @@
+import os
+import sys
+import subprocess
+from statistics import median
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TOPIC_MODELING_DIR = f"{BASE_DIR}/topic_modeling"
+
+# Modules to be imported and the directory they are run from
+MODULES = [("utils", BASE_DIR),
+           ("commonality", BASE_DIR),
+           ("flows", BASE_DIR),
+           ("batch", BASE_DIR),
+           ("translator", BASE_DIR),
+           ("gensim_LDA", TOPIC_MODELING_DIR)]
+
+MODELS = ["spacy_md", "spacy_sm", "argos", "google", "argos_engine_fre", "argos_splitter_fre"]
+
+REPEATS = 5
+
+
+def main():
+    print("Import time")
+    for module, working_dir in MODULES:
+        print_timing(module, time_snippet(f"import {module}", working_dir))
+    print("Model load time")
+    for model in MODELS:
+        print_timing(model, time_snippet(f"from models import get_model; get_model('{model}')", BASE_DIR, 1))
+
+
+def time_snippet(snippet: str, working_dir: str, repeats: int = REPEATS) -> list[float]:
+    """
+    Time a snippet of code in fresh interpreters, so that nothing is already imported or loaded
+    :param snippet: code to be timed
+    :param working_dir: directory the interpreter is run from
+    :param repeats: number of interpreters to be run
+    :return: seconds taken by each run, empty if the snippet fails
+    """
+    timer = f"import time; start = time.perf_counter(); {snippet}; print(time.perf_counter() - start)"
+    timings = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", timer], cwd=working_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr.strip().splitlines()[-1])
+            return []
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def print_timing(name: str, timings: list[float]):
+    if timings:
+        print(f"{name:<12} median {median(timings):.3f}s  min {min(timings):.3f}s")
+    else:
+        print(f"{name:<12} failed")
+
+
+if __name__ == "__main__":
+    main()
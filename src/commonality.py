@@ -2,8 +2,9 @@ import os
 import json
 import itertools
 from utils import NEWS_DIR, TRANSLATED_NEWS_DIR, UseCarousels
-from utils import get_dict_items, date_to_epoch, get_originals_data
+from utils import get_dict_items, get_dict_items_variants, date_to_epoch, get_originals_data, get_out_path
 from utils import has_equivalent_in_snapshot_linked, has_equivalent_in_snapshot_spacy
+from utils import get_link_indexes, find_linked_equivalent, find_spacy_equivalents
 from enum import Enum
 
 
@@ -14,9 +15,21 @@ class SnapshotEquivalents(Enum):
 
 CAROUSEL = ["_no_carousels", "_carousels", ""]
 
+# Fields needed by the analyses that only rely on Swissinfo translation links
+LINK_FIELDS = ("lang", "translations")
+
 WORKING_DIR = TRANSLATED_NEWS_DIR
 # WORKING_DIR = NEWS_DIR
 
+# Compute SPACY equivalences for a whole section at once instead of pair by pair
+BATCHED_SPACY = True
+
+# Cluster items as the connected components of their translation links instead of grouping an item with the first
+# cluster whose ids contain, or are contained in, its own. Transitive clusters merge items sharing a translation even
+# when neither ids contain the other, so they differ from the published statistics, which use the grouping by
+# inclusion
+TRANSITIVE_CLUSTERS = False
+
 LANGS = [lang for lang in os.listdir(WORKING_DIR)]
 
 START_DATE = "2023-10-23 23:45:00"
@@ -35,12 +48,14 @@ LANGS_TRANSL = ["Italiano", "English", "Français", "Deutsch"]
 
 
 def one_commons(main_items: list[dict], other_items: dict,
-                simil_snapshot_fun: SnapshotEquivalents = SnapshotEquivalents.LINKED, simil_cache: dict = None) -> tuple[dict, list[tuple]]:
+                simil_snapshot_fun: SnapshotEquivalents = SnapshotEquivalents.LINKED, simil_cache: dict = None,
+                link_indexes: dict = None) -> tuple[dict, list[tuple]]:
     """
     Given a set of items, compute how much news the other sections has in common with it
     :param main_items: list of items "pivot"
     :param other_items: list of sections to check commonality of
     :param simil_snapshot_fun: function to use for check equivalence in the set
+    :param link_indexes: link indexes of the sections in other_items, built once per window and reused by LINKED
     :return: number of news in common between each version and the main_items and list of paired urls
     """
 
@@ -51,9 +66,19 @@ def one_commons(main_items: list[dict], other_items: dict,
     commons = {lang: 0 for lang in other_items.keys()}
     paired = []
 
+    if simil_snapshot_fun is SnapshotEquivalents.LINKED and link_indexes is None:
+        link_indexes = get_link_indexes(other_items)
+
     for lang, items_set in other_items.items():
-        for to_check in main_items:
-            found, pair = simil_snapshot_fun(to_check, items_set, simil_cache)
+        if simil_snapshot_fun is SnapshotEquivalents.SPACY and BATCHED_SPACY:
+            equivalents = find_spacy_equivalents(main_items, items_set)
+        for i, to_check in enumerate(main_items):
+            if simil_snapshot_fun is SnapshotEquivalents.LINKED:
+                found, pair = find_linked_equivalent(to_check, link_indexes[lang])
+            elif simil_snapshot_fun is SnapshotEquivalents.SPACY and BATCHED_SPACY:
+                found, pair = equivalents[i]
+            else:
+                found, pair = simil_snapshot_fun(to_check, items_set, simil_cache)
             if found:
                 commons[lang] += 1
                 paired.append((to_check["item_url"], pair))
@@ -61,40 +86,51 @@ def one_commons(main_items: list[dict], other_items: dict,
 
 
 def run_one_commons(simil_snapshot_fun: SnapshotEquivalents = SnapshotEquivalents.LINKED,
-                    find_unpaired: bool = True, carousels=UseCarousels.YES) -> dict[dict]:
+                    find_unpaired: bool = True, carousels=UseCarousels.YES, news_items: dict = None,
+                    window: tuple[str, str] = None) -> dict[dict]:
     """
     Run one_commons for each language section
     :param find_unpaired: boolean for computing also the list of the not paired news translations
     :param simil_snapshot_fun: function to use for check equivalence in the set
     :param carousels: how to handle carousels
+    :param news_items: items of the time range grouped by language section, if already loaded
+    :param window: starting and ending date of the time range, START_DATE and END_DATE if not given
     :return: a dictionary for each section which states the items in common with each of them
     """
 
     # Comment for using the links methods
     # simil_snapshot_fun = SnapshotEquivalents.LINKED
 
-    outpath_ending = f"{OUT_START_DATE}_{OUT_END_DATE}{CAROUSEL[carousels.value]}_SPACY.json"
+    if window is None:
+        window = (START_DATE, END_DATE)
+    method = "LINKED" if simil_snapshot_fun is SnapshotEquivalents.LINKED else "SPACY"
+    outpath_ending = f"{get_out_path(window)}{CAROUSEL[carousels.value]}_{method}.json"
 
-    news_items = get_dict_items(START_EPOCH, END_EPOCH, WORKING_DIR, carousels=carousels)
+    if news_items is None:
+        fields = LINK_FIELDS if simil_snapshot_fun is SnapshotEquivalents.LINKED else None
+        news_items = get_dict_items(date_to_epoch(window[0]), date_to_epoch(window[1]), WORKING_DIR,
+                                    carousels=carousels, fields=fields)
     commons = {lang: {} for lang in news_items.keys()}
     paired = []
 
     simil_cache = {}
+    link_indexes = get_link_indexes(news_items) if simil_snapshot_fun is SnapshotEquivalents.LINKED else None
 
     # For each language section, compute the commons in other sections
     for lang in commons.keys():
-        commons[lang], pairs = one_commons(news_items[lang], news_items, simil_snapshot_fun=simil_snapshot_fun, simil_cache = simil_cache)
+        commons[lang], pairs = one_commons(news_items[lang], news_items, simil_snapshot_fun=simil_snapshot_fun,
+                                           simil_cache=simil_cache, link_indexes=link_indexes)
         for pair in pairs:
             paired.append(pair)
 
     # This is for outputting the translations references not found in the homepages of the related Swissinfo version
     if find_unpaired:
-        unpaired = get_unpaired(news_items)
+        unpaired = get_unpaired(news_items, window)
         with open(f"../out/unpaired_{outpath_ending}", "w", encoding="utf-8") as f:
             json.dump(unpaired, f, indent=4)
             f.write("\n")
 
-    commons["info"] = {"start_date": START_DATE, "end_date": END_DATE, "len": {}}
+    commons["info"] = {"start_date": window[0], "end_date": window[1], "len": {}}
     # Adding Meta-Infos
     for lang in news_items.keys():
         infos = commons["info"]
@@ -113,8 +149,8 @@ def run_one_commons(simil_snapshot_fun: SnapshotEquivalents = SnapshotEquivalent
     return commons
 
 
-def get_unpaired(news_items: dict) -> dict[dict[str]]:
-    lang_urls = {lang: [item["item_url"] for item in news_items[lang]] for lang in news_items.keys()}
+def get_unpaired(news_items: dict, window: tuple[str, str] = None) -> dict[dict[str]]:
+    lang_urls = {lang: set(item["item_url"] for item in news_items[lang]) for lang in news_items.keys()}
     unpaired = {lang_1: {lang_2: [] for lang_2 in news_items.keys()} for lang_1 in news_items.keys()}
     for lang in news_items.keys():
         for elem in news_items[lang]:
@@ -131,7 +167,9 @@ def get_unpaired(news_items: dict) -> dict[dict[str]]:
         for lang_2 in news_items.keys():
             unpaired["info"]["unpaired_len"][lang_1]["total"] += len(unpaired[lang_1][lang_2])
 
-    outpath_ending = f"{OUT_START_DATE}_{OUT_END_DATE}.json"
+    if window is None:
+        window = (START_DATE, END_DATE)
+    outpath_ending = f"{get_out_path(window)}.json"
     with open(f"../out/unpaired_items/{outpath_ending}", "w", encoding="utf-8") as f:
         json.dump(unpaired, f, indent=4)
         f.write("\n")
@@ -151,65 +189,248 @@ def get_id(news_item: dict) -> frozenset:
     return frozenset([article_id] + translations_id)
 
 
-def get_cardinalities(news_items: list[dict], to_out: bool = False, carousels=UseCarousels.YES) \
-        -> dict[frozenset, list[dict]]:
+def find_root(parents: list[int], node: int) -> int:
+    """
+    Find the representative of the cluster of a node, compressing the path to it
+    """
+    root = node
+    while parents[root] != root:
+        root = parents[root]
+    while parents[node] != root:
+        parents[node], node = root, parents[node]
+    return root
+
+
+def group_by_inclusion(news_items: list[dict]) -> dict[frozenset, list[dict]]:
+    """
+    Group every news item with the first cluster, in the order of the dictionary, whose ids contain its own ids or
+    are contained in them. The ids of a cluster are the largest ids among its items, and clusters are never merged
+    with each other. Such a cluster shares at least one id with the item, so only the clusters found through an
+    index of their ids are checked
+    :param news_items: items to be clustered
+    :return: a dictionary where keys are the ids of a cluster and values are its items
+    """
     unique_articles = {}
+    # Clusters containing each id, and the position of each cluster in the order of unique_articles
+    clusters_by_id = {}
+    positions = {}
+    next_position = 0
     for news_item in news_items:
-        already_appended = []
         article_id = get_id(news_item)
-        found_ids = unique_articles.keys()
-        is_found = False
-        for found_id in found_ids:
-            intersection = article_id.intersection(found_id)
-            if intersection == found_id or intersection == article_id:
-                if intersection == article_id:
-                    article_id = found_id
-                if intersection == found_id:
-                    unique_articles[article_id] = unique_articles.pop(found_id)
-                is_found = True
-                already_appended = [art["item_url"] for art in unique_articles[article_id]]
+        candidates = {found_id for single_id in article_id for found_id in clusters_by_id.get(single_id, ())}
+        found_id = None
+        for candidate in sorted(candidates, key=positions.get):
+            intersection = article_id.intersection(candidate)
+            if intersection == candidate or intersection == article_id:
+                found_id = candidate
                 break
-        if not is_found:
-            unique_articles[article_id] = []
 
-        if news_item["item_url"] not in already_appended:
+        if found_id is None:
+            unique_articles[article_id] = []
+        elif found_id.issubset(article_id):
+            # The cluster takes the ids of the item and moves to the end of the dictionary
+            unique_articles[article_id] = unique_articles.pop(found_id)
+            del positions[found_id]
+            for single_id in found_id:
+                clusters_by_id[single_id].discard(found_id)
+        else:
+            article_id = found_id
+        if article_id not in positions:
+            positions[article_id] = next_position
+            next_position += 1
+            for single_id in article_id:
+                clusters_by_id.setdefault(single_id, set()).add(article_id)
+
+        if all(article["item_url"] != news_item["item_url"] for article in unique_articles[article_id]):
             unique_articles[article_id].append(news_item)
+    return unique_articles
+
+
+def group_by_links(news_items: list[dict]) -> dict[frozenset, list[dict]]:
+    """
+    Cluster the news items connected through their translation links, by joining every item with the ids of its
+    translations in a disjoint-set forest. Two items sharing a translation are in the same cluster even when neither
+    ids contain the other
+    :param news_items: items to be clustered
+    :return: a dictionary where keys are the ids of a cluster and values are its items
+    """
+    # Ids are interned to integers, each article joins its own id with the ids of its translations
+    interned = {}
+    parents = []
+    articles_ids = []
+    for news_item in news_items:
+        ids = []
+        for single_id in get_id(news_item):
+            if single_id not in interned:
+                interned[single_id] = len(parents)
+                parents.append(len(parents))
+            ids.append(interned[single_id])
+        articles_ids.append(ids)
+        root = find_root(parents, ids[0])
+        for single_id in ids[1:]:
+            other_root = find_root(parents, single_id)
+            if other_root != root:
+                parents[other_root] = root
+
+    clusters = {}
+    for news_item, ids in zip(news_items, articles_ids):
+        clusters.setdefault(find_root(parents, ids[0]), []).append(news_item)
+    cluster_ids = {root: set() for root in clusters.keys()}
+    for single_id, node in interned.items():
+        root = find_root(parents, node)
+        if root in cluster_ids:
+            cluster_ids[root].add(single_id)
+
+    unique_articles = {}
+    for root, articles in clusters.items():
+        already_appended = set()
+        unique_articles[frozenset(cluster_ids[root])] = []
+        for article in articles:
+            if article["item_url"] not in already_appended:
+                already_appended.add(article["item_url"])
+                unique_articles[frozenset(cluster_ids[root])].append(article)
+    return unique_articles
+
+
+def get_cardinalities(news_items: list[dict], to_out: bool = False, carousels=UseCarousels.YES,
+                      window: tuple[str, str] = None, transitive: bool = None) -> dict[frozenset, list[dict]]:
+    """
+    Cluster the news items that are translations of each other, either by inclusion of their ids or as the connected
+    components of their translation links
+    :param news_items: items to be clustered
+    :param to_out: boolean for outputting the clusters
+    :param carousels: how to handle carousels
+    :param window: starting and ending date of the time range for the output title, START_DATE and END_DATE if not given
+    :param transitive: whether to cluster by translation links with group_by_links, or by inclusion with
+    group_by_inclusion. TRANSITIVE_CLUSTERS if not given
+    :return: a dictionary where keys are the ids in a cluster and values are its items, at most one for each language
+    """
+    if transitive is None:
+        transitive = TRANSITIVE_CLUSTERS
+    unique_articles = group_by_links(news_items) if transitive else group_by_inclusion(news_items)
 
     if to_out:
         output_unique_articles = {}
         for article_id, articles in unique_articles.items():
             output_unique_articles[str(sorted(article_id))] = articles
-        with open(f"../out/ids_with_cardinalities/{OUT_START_DATE}_{OUT_END_DATE}.json", "w", encoding="utf-8") as f:
+        if window is None:
+            window = (START_DATE, END_DATE)
+        with open(f"../out/ids_with_cardinalities/{get_out_path(window)}.json", "w", encoding="utf-8") as f:
             json.dump(output_unique_articles, f, indent=4)
             f.write("\n")
     # This is for removing eventual duplicates
     to_ret = {key: [] for key in unique_articles.keys()}
     for cycling_id in unique_articles.keys():
-        print(cycling_id)
-        already_found = []
+        already_found = set()
         for article in unique_articles[cycling_id]:
             if article["lang"] not in already_found:
-                already_found.append(article["lang"])
+                already_found.add(article["lang"])
                 to_ret[cycling_id].append(article)
     for cycling_id in unique_articles.keys():
-        print(f"{cycling_id} : {len(unique_articles[cycling_id])} -> {len(to_ret[cycling_id])}")
         if len(to_ret[cycling_id]) > 4:
             print([new["item_url"] for new in to_ret[cycling_id]])
     return to_ret
 
 
-def get_one_cardinality(article: dict, unique_articles: dict[frozenset, list[dict]]) -> int:
-    for article_id in unique_articles.keys():
-        intersection = get_id(article).intersection(article_id)
+def get_cardinality_index(unique_articles: dict[frozenset, list[dict]]) -> dict[str, int]:
+    """
+    Map every id of every cluster to the cardinality of the cluster. Only valid for transitive clusters, where every
+    id is in a single cluster
+    :param unique_articles: clusters computed by get_cardinalities
+    :return: a dictionary where keys are ids and values are cardinalities
+    """
+    cardinalities = {}
+    for article_id, articles in unique_articles.items():
+        for single_id in article_id:
+            cardinalities[single_id] = len(articles)
+    return cardinalities
+
+
+def get_one_cardinality(article: dict, cardinalities: dict[str, int]) -> int:
+    """
+    Get the cardinality of the cluster of an article
+    :param article: article to be checked
+    :param cardinalities: cardinalities of the ids, computed by get_cardinality_index
+    :return: the number of items in the cluster of the article, 0 if it was not clustered
+    """
+    return cardinalities.get(article["lang"] + get_url_numbers(article["item_url"]), 0)
+
+
+def get_inclusion_index(unique_articles: dict[frozenset, list[dict]]) -> dict[str, list[tuple[int, frozenset]]]:
+    """
+    Map every id to the clusters containing it, with their position in the order of the dictionary
+    :param unique_articles: clusters computed by get_cardinalities by inclusion
+    :return: a dictionary where keys are ids and values are the positions and ids of their clusters
+    """
+    clusters_by_id = {}
+    for position, article_id in enumerate(unique_articles.keys()):
+        for single_id in article_id:
+            clusters_by_id.setdefault(single_id, []).append((position, article_id))
+    return clusters_by_id
+
+
+def get_inclusion_cardinality(article: dict, unique_articles: dict[frozenset, list[dict]],
+                              clusters_by_id: dict[str, list[tuple[int, frozenset]]]) -> int:
+    """
+    Get the cardinality of the first cluster whose ids contain the ids of an article, or are contained in them.
+    Only the clusters sharing an id with the article are checked
+    :param article: article to be checked
+    :param unique_articles: clusters computed by get_cardinalities by inclusion
+    :param clusters_by_id: clusters of each id, computed by get_inclusion_index
+    :return: the number of items in the cluster of the article, 0 if it was not clustered
+    """
+    article_id = get_id(article)
+    candidates = {candidate for single_id in article_id for candidate in clusters_by_id.get(single_id, ())}
+    for _, found_id in sorted(candidates, key=lambda candidate: candidate[0]):
+        intersection = article_id.intersection(found_id)
+        if intersection == found_id:
+            # The ids of the article are a cluster of their own, or contain the ids of the first cluster found
+            return len(unique_articles.get(article_id, unique_articles[found_id]))
         if intersection == article_id:
-            return len(unique_articles[get_id(article)])
-        if intersection == get_id(article):
-            return len(unique_articles[article_id])
+            return len(unique_articles[found_id])
     return 0
 
 
-def get_cardinalities_stat(by_couples: bool = True, by_triples: bool = True, carousels=UseCarousels.YES) \
-        -> dict[str, dict]:
+def get_coverage_counts(unique_articles: dict[frozenset, list[dict]], langs: list[str]) -> list[int]:
+    """
+    Count how many clusters cover each set of languages. The languages of each cluster are encoded as a bitmask,
+    then the counts of the masks are summed into the counts of all their subsets
+    :param unique_articles: clusters computed by get_cardinalities
+    :param langs: languages to be considered, the i-th one is the i-th bit of the masks
+    :return: list where the element at a mask is the number of clusters with at least the languages in the mask
+    """
+    bits = {lang: 1 << i for i, lang in enumerate(langs)}
+    coverage = [0] * (1 << len(langs))
+    for articles in unique_articles.values():
+        mask = 0
+        for article in articles:
+            mask |= bits.get(article["lang"], 0)
+        coverage[mask] += 1
+    for bit in bits.values():
+        for mask in range(len(coverage)):
+            if not mask & bit:
+                coverage[mask] += coverage[mask | bit]
+    return coverage
+
+
+def get_subsets_cardinalities(coverage: list[int], langs: list[str], size: int) -> dict[str, int]:
+    """
+    Get the number of clusters covering each combination of languages of a given size
+    :param coverage: counts computed by get_coverage_counts
+    :param langs: languages used for computing coverage
+    :param size: number of languages in each combination
+    :return: a dictionary where keys are the languages of a combination joined by '-' and values are cardinalities
+    """
+    cardinalities = {}
+    for comb in itertools.combinations(range(len(langs)), size):
+        mask = sum(1 << i for i in comb)
+        cardinalities['-'.join(langs[i] for i in comb)] = coverage[mask]
+    return cardinalities
+
+
+def get_cardinalities_stat(by_couples: bool = True, by_triples: bool = True, carousels=UseCarousels.YES,
+                           news_items: dict = None, window: tuple[str, str] = None,
+                           transitive: bool = None) -> dict[str, dict]:
     """
     Given a range of time, get the cardinalities of the set of news translated respectively in
     two, three or four different languages
@@ -217,63 +438,55 @@ def get_cardinalities_stat(by_couples: bool = True, by_triples: bool = True, car
     :param by_triples: boolean for computing the cardinalities of the set of news translated in three different language
     :return: A dictionary with one key for each possible number of citations and its cardinality and a dictionary
     :param carousels: How to handle carousels
+    :param news_items: items of the time range grouped by language section, if already loaded
+    :param window: starting and ending date of the time range, START_DATE and END_DATE if not given
+    :param transitive: whether news are clustered by translation links, which merges more of them, or by inclusion of
+    their ids as in the published statistics. TRANSITIVE_CLUSTERS if not given
     with the same sets but grouped by languages
     """
-    news_items = get_dict_items(START_EPOCH, END_EPOCH, WORKING_DIR, carousels=carousels)
+    if transitive is None:
+        transitive = TRANSITIVE_CLUSTERS
+    if window is None:
+        window = (START_DATE, END_DATE)
+    if news_items is None:
+        news_items = get_dict_items(date_to_epoch(window[0]), date_to_epoch(window[1]), WORKING_DIR,
+                                    carousels=carousels, fields=LINK_FIELDS)
     listed_items = []
     for lang in news_items.keys():
         for article in news_items[lang]:
             listed_items.append(article)
-    unique_articles = get_cardinalities(listed_items, False)
+    unique_articles = get_cardinalities(listed_items, False, transitive=transitive)
+    if transitive:
+        cardinalities = get_cardinality_index(unique_articles)
+    else:
+        clusters_by_id = get_inclusion_index(unique_articles)
 
     overall_cardinalities = {"1": 0, "2": 0, "3": 0, "4": 0}
     language_cardinalities = {lang: {"1": 0, "2": 0, "3": 0, "4": 0} for lang in news_items.keys()}
 
     for lang in news_items.keys():
         for news_item in news_items[lang]:
-            card = get_one_cardinality(news_item, unique_articles)
-            print(card)
+            if transitive:
+                card = get_one_cardinality(news_item, cardinalities)
+            else:
+                card = get_inclusion_cardinality(news_item, unique_articles, clusters_by_id)
             if card > 4:
                 print(news_item["item_url"])
                 print(card)
-            language_cardinalities[lang][str(get_one_cardinality(news_item, unique_articles))] += 1
+            language_cardinalities[lang][str(card)] += 1
     for unique_article in unique_articles.keys():
         overall_cardinalities[str(len(unique_articles[unique_article]))] += 1
 
     to_print = {"overall": overall_cardinalities, "by_language": language_cardinalities}
 
+    langs = [lang.lower() for lang in LANG_FORMATTER.values()]
+    coverage = get_coverage_counts(unique_articles, langs)
     if by_couples:
-        langs = list(LANG_FORMATTER.values())
-        langs = [lang.lower() for lang in langs]
-        couples = list(itertools.combinations(langs, 2))
-        couples_cardinalities = {couple: 0 for couple in couples}
-        for couple in couples:
-            for unique_id, articles in unique_articles.items():
-                if len(articles) >= 2:
-                    true_langs = [article["lang"] for article in articles]
-                    if couple[0] in true_langs and couple[1] in true_langs:
-                        couples_cardinalities[couple] += 1
-
-        out_couples = {'-'.join(couple): cardinality for couple, cardinality in couples_cardinalities.items()}
-        to_print["by_couples"] = out_couples
-    print(unique_articles.keys())
+        to_print["by_couples"] = get_subsets_cardinalities(coverage, langs, 2)
     if by_triples:
-        langs = list(LANG_FORMATTER.values())
-        langs = [lang.lower() for lang in langs]
-        triples = list(itertools.combinations(langs, 3))
-        triples_cardinalities = {triple: 0 for triple in triples}
-
-        for triple in triples:
-            for unique_id, articles in unique_articles.items():
-                if len(articles) >= 3:
-                    true_langs = [article["lang"] for article in articles]
-                    if triple[0] in true_langs and triple[1] in true_langs and triple[2] in true_langs:
-                        triples_cardinalities[triple] += 1
-
-        out_triples = {'-'.join(triple): cardinality for triple, cardinality in triples_cardinalities.items()}
-        to_print["by_triples"] = out_triples
-
-    with open(f"../out/cardinalities_stats/{OUT_START_DATE}_{OUT_END_DATE}{CAROUSEL[carousels.value]}.json", "w",
+        to_print["by_triples"] = get_subsets_cardinalities(coverage, langs, 3)
+
+    with open(f"../out/cardinalities_stats/{get_out_path(window)}{CAROUSEL[carousels.value]}.json", "w",
               encoding="utf-8") as f:
         json.dump(to_print, f, indent=4)
         f.write("\n")
@@ -284,8 +497,8 @@ def main():
     # run_one_commons(carousels=UseCarousels.NO, simil_snapshot_fun=SnapshotEquivalents.SPACY)
     # # get_unpaired(get_dict_items(START_EPOCH, END_EPOCH, WORKING_DIR))
     get_cardinalities_stat(carousels=UseCarousels.NO)
-    # for carousels in UseCarousels:
-    #     get_originals_data(START_EPOCH, END_EPOCH, WORKING_DIR, carousels)
+    # for carousels, news_items in get_dict_items_variants(START_EPOCH, END_EPOCH, WORKING_DIR).items():
+    #     get_originals_data(START_EPOCH, END_EPOCH, WORKING_DIR, carousels, OUT_START_DATE, OUT_END_DATE, news_items)
 
 
 if __name__ == '__main__':
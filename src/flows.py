@@ -2,8 +2,8 @@
 import json
 import os
 from utils import NEWS_DIR, TRANSLATED_NEWS_DIR, UseCarousels
-from utils import get_dict_items, date_to_epoch
-from utils import get_originals_data
+from utils import get_dict_items, get_dict_items_variants, date_to_epoch, to_out_date, get_out_path
+from utils import get_originals_data, get_link_indexes
 from commonality import one_commons
 
 WORKING_DIR = TRANSLATED_NEWS_DIR
@@ -34,21 +34,39 @@ OUT_DIR = f"{BASE_DIR}{SEPARATOR}..{SEPARATOR}out{SEPARATOR}originals_stats{SEPA
 
 
 def main():
-    for carousel in UseCarousels:
-        get_flows(carousel)
+    # All the ways of handling carousels come from a single load
+    for carousel, news_items in get_dict_items_variants(START_EPOCH, END_EPOCH, WORKING_DIR).items():
+        get_flows(carousel, news_items)
 
 
-def get_flows(carousels=UseCarousels.YES) -> dict:
-    news_items = get_dict_items(START_EPOCH, END_EPOCH, WORKING_DIR, carousels=carousels)
+def get_flows(carousels=UseCarousels.YES, news_items: dict = None, window: tuple[str, str] = None,
+              originals_data: dict = None) -> dict:
+    """
+    Compute how many news originally written in each language are also in the other sections
+    :param carousels: how to handle carousels
+    :param news_items: items of the time range grouped by language section, if already loaded
+    :param window: starting and ending date of the time range, START_DATE and END_DATE if not given
+    :param originals_data: result of get_originals_data on the same items, if already computed
+    :return: a dictionary for each original language with the number of its news in each other section
+    """
+    if window is None:
+        window = (START_DATE, END_DATE)
+    start_epoch, end_epoch = date_to_epoch(window[0]), date_to_epoch(window[1])
+    if news_items is None:
+        news_items = get_dict_items(start_epoch, end_epoch, WORKING_DIR, carousels=carousels)
     flows = {key_1: {} for key_1 in news_items.keys()}
-    originals = get_originals_data(START_EPOCH, END_EPOCH, WORKING_DIR, carousels=carousels, start_date=OUT_START_DATE,
-                                   end_date=OUT_END_DATE)["data"]
+    if originals_data is None:
+        originals_data = get_originals_data(start_epoch, end_epoch, WORKING_DIR, carousels=carousels,
+                                            start_date=to_out_date(window[0]), end_date=to_out_date(window[1]),
+                                            items=news_items)
+    originals = originals_data["data"]
+    link_indexes = get_link_indexes(news_items)
     for starting_lang in flows.keys():
         to_check_items = originals[starting_lang]
         temp_items = news_items.copy()
         del temp_items[starting_lang]
-        flows[starting_lang] = one_commons(to_check_items, temp_items)[0]
-    outpath_ending = f"{OUT_START_DATE}_{OUT_END_DATE}{CAROUSEL[carousels.value]}.json"
+        flows[starting_lang] = one_commons(to_check_items, temp_items, link_indexes=link_indexes)[0]
+    outpath_ending = f"{get_out_path(window)}{CAROUSEL[carousels.value]}.json"
     with open(f"{OUT_DIR}{outpath_ending}", "w", encoding="utf-8") as f:
         json.dump(flows, f, indent=4)
         f.write("\n")
@@ -0,0 +1,61 @@
+EN_FIELDS = ("en_title", "en_content", "en_subtitle")
+
+# Fields an untranslated item keeps even when it is projected, since they are needed for translating it later
+SOURCE_FIELDS = ("lang", "title", "subtitle", "content")
+
+
+class LazyItem(dict):
+    """
+    Scraped item that is translated, through the translation memory, only when one of its english fields is read
+    """
+
+    def __missing__(self, key):
+        if key not in EN_FIELDS:
+            raise KeyError(key)
+        translate_items([self])
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key in EN_FIELDS:
+            return self[key]
+        return dict.get(self, key, default)
+
+
+def make_lazy(projected: dict, item: dict) -> LazyItem:
+    """
+    Wrap an untranslated item so that it gets translated on demand
+    :param projected: item with only the fields to be kept
+    :param item: whole scraped item
+    :return: the lazy item, with the kept fields and the source text
+    """
+    lazy = LazyItem(projected)
+    for field in SOURCE_FIELDS:
+        if field in item:
+            lazy[field] = item[field]
+    return lazy
+
+
+def is_pending(item: dict) -> bool:
+    """
+    Check whether an item is waiting to be translated
+    :param item: item to be checked
+    :return: True if it is a lazy item that was not translated yet
+    """
+    return isinstance(item, LazyItem) and not dict.__contains__(item, "en_subtitle")
+
+
+def translate_items(items: list[dict]):
+    """
+    Translate in one batch the lazy items that were not translated yet, other items are left untouched. English
+    fields that could not be translated are set to None, so that they are not tried again
+    :param items: items to be translated
+    """
+    pending = [item for item in items if is_pending(item)]
+    if not pending:
+        return
+    # The translator loads its models, so it is imported only when something actually has to be translated
+    from translator import translate_snaps_batched
+    translate_snaps_batched([pending])
+    for item in pending:
+        for field in EN_FIELDS:
+            dict.setdefault(item, field, None)
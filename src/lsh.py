@@ -0,0 +1,89 @@
+import numpy as np
+from collections import Counter
+
+
+def get_codes(vectors: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """
+    Hash vectors with random hyperplanes, one code for each table
+    :param vectors: matrix with one vector for each row
+    :param planes: hyperplanes with shape (tables, bits, dimension)
+    :return: matrix of codes with shape (rows, tables)
+    """
+    bits = np.einsum("tbd,nd->ntb", planes, vectors) > 0
+    powers = 1 << np.arange(planes.shape[1], dtype=np.int64)
+    return bits.astype(np.int64) @ powers
+
+
+def build_lsh_index(vectors: np.ndarray, n_tables: int = 8, n_bits: int = 12, seed: int = 0) -> dict:
+    """
+    Build a random-hyperplane LSH index over normalized vectors, so that vectors with a high cosine similarity
+    fall in the same bucket of at least one table with high probability
+    :param vectors: matrix with one normalized vector for each row
+    :param n_tables: number of hash tables, more tables give a higher recall
+    :param n_bits: number of hyperplanes for each table, more bits give smaller buckets
+    :param seed: seed of the random hyperplanes
+    :return: the index, with the indexed vectors, the hyperplanes and the buckets of each table
+    """
+    planes = np.random.default_rng(seed).standard_normal((n_tables, n_bits, vectors.shape[1])).astype(np.float32)
+    codes = get_codes(vectors, planes)
+    tables = [{} for _ in range(n_tables)]
+    for row, row_codes in enumerate(codes):
+        for table, code in zip(tables, row_codes):
+            table.setdefault(int(code), []).append(row)
+    return {"vectors": vectors, "planes": planes, "tables": tables}
+
+
+def query_candidates(index: dict, queries: np.ndarray, k: int = 10) -> list[np.ndarray]:
+    """
+    Get the top-k candidate neighbours of each query, the indexed vectors sharing a bucket with it in the most tables
+    :param index: LSH index
+    :param queries: matrix with one normalized query for each row
+    :param k: maximum number of candidates for each query
+    :return: for each query the rows of its candidates in the index, sorted by row
+    """
+    codes = get_codes(queries, index["planes"])
+    candidates = []
+    for query_codes in codes:
+        collisions = Counter()
+        for table, code in zip(index["tables"], query_codes):
+            collisions.update(table.get(int(code), []))
+        candidates.append(np.array(sorted(row for row, _ in collisions.most_common(k)), dtype=np.int64))
+    return candidates
+
+
+def find_similar(index: dict, queries: np.ndarray, threshold: float, k: int = 10) -> list[int]:
+    """
+    For each query, get the first indexed vector whose cosine similarity is above a threshold, checking exactly
+    only the top-k candidates
+    :param index: LSH index
+    :param queries: matrix with one normalized query for each row
+    :param threshold: similarity threshold
+    :param k: number of candidates checked for each query
+    :return: for each query the row of the first similar vector in the index, -1 if none is found
+    """
+    found = []
+    for query, candidates in zip(queries, query_candidates(index, queries, k)):
+        if len(candidates) == 0:
+            found.append(-1)
+            continue
+        similar = candidates[index["vectors"][candidates] @ query > threshold]
+        found.append(int(similar[0]) if len(similar) > 0 else -1)
+    return found
+
+
+def lsh_recall(index: dict, queries: np.ndarray, threshold: float, k: int = 10) -> float:
+    """
+    Compare find_similar with brute force on some queries
+    :param index: LSH index
+    :param queries: matrix with one normalized query for each row
+    :param threshold: similarity threshold
+    :param k: number of candidates checked for each query
+    :return: share of the queries with a similar vector for which find_similar finds the same one as brute force
+    """
+    similar = (queries @ index["vectors"].T) > threshold
+    expected = np.where(similar.any(axis=1), similar.argmax(axis=1), -1)
+    found = np.array(find_similar(index, queries, threshold, k))
+    with_similar = expected >= 0
+    if not with_similar.any():
+        return 1.0
+    return float((found[with_similar] == expected[with_similar]).mean())
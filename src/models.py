@@ -0,0 +1,74 @@
+import time
+from functools import partial
+
+from argos_engine import TO_ARGOS_LANG
+
+# Models loaded in this process by name
+MODELS = {}
+
+
+def load_spacy_md():
+    import spacy
+    return spacy.load("en_core_web_md")
+
+
+def load_spacy_sm():
+    import en_core_web_sm
+    return en_core_web_sm.load()
+
+
+def load_argos_translators():
+    from translator import setup_translators
+    return setup_translators()
+
+
+def load_argos_engine(lang: str) -> dict:
+    import ctranslate2
+    import sentencepiece
+    from argos_engine import THREADS, get_argos_package
+    package_path = str(get_argos_package(lang).package_path)
+    return {"translator": ctranslate2.Translator(f"{package_path}/model", device="cpu", intra_threads=THREADS),
+            "tokenizer": sentencepiece.SentencePieceProcessor(model_file=f"{package_path}/sentencepiece.model")}
+
+
+def load_argos_splitter(lang: str):
+    import stanza
+    from argos_engine import get_argos_package
+    package_path = str(get_argos_package(lang).package_path)
+    return stanza.Pipeline(lang=TO_ARGOS_LANG[lang], dir=f"{package_path}/stanza", processors="tokenize",
+                           use_gpu=False, logging_level="WARN")
+
+
+def load_google_translator():
+    from googletrans import Translator
+    return Translator()
+
+
+LOADERS = {"spacy_md": load_spacy_md,
+           "spacy_sm": load_spacy_sm,
+           "argos": load_argos_translators,
+           "google": load_google_translator,
+           **{f"argos_engine_{lang}": partial(load_argos_engine, lang) for lang in TO_ARGOS_LANG},
+           **{f"argos_splitter_{lang}": partial(load_argos_splitter, lang) for lang in TO_ARGOS_LANG}}
+
+
+def get_model(name: str):
+    """
+    Get a model, loading it on first use. Every process keeps a single instance of each model
+    :param name: name of the model, among LOADERS
+    :return: the loaded model
+    """
+    if name not in MODELS:
+        start = time.time()
+        MODELS[name] = LOADERS[name]()
+        print(f"Loaded {name} in {time.time() - start:.1f}s")
+    return MODELS[name]
+
+
+def prewarm(names: list[str]):
+    """
+    Load some models ahead of their first use, for example as the initializer of a pool of processes
+    :param names: names of the models, among LOADERS
+    """
+    for name in names:
+        get_model(name)
@@ -0,0 +1,114 @@
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Analyses are imported inside the jobs: every job runs in a fresh process, so the topic modeling scripts can
+# import their own utils module and models are released as soon as a job ends
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TOPIC_MODELING_DIR = f"{BASE_DIR}/topic_modeling"
+
+WINDOWS = [(f"2023-11-{day} 16:15:00", f"2023-11-{day} 16:29:00") for day in range(21, 31)] + \
+          [(f"2023-12-{day} 16:15:00", f"2023-12-{day} 16:29:00") for day in range(1, 22)]
+
+ANALYSES = ["cardinalities", "linked", "spacy", "flows", "originals", "lda"]
+
+# Memory slots taken by each analysis, the jobs running together never take more than MEMORY_SLOTS
+JOB_MEMORY = {"cardinalities": 1, "linked": 1, "spacy": 3, "flows": 1, "originals": 1, "lda": 3}
+MEMORY_SLOTS = 8
+
+WORKERS = os.cpu_count()
+
+
+def main():
+    run_schedule(WINDOWS, ["cardinalities", "linked", "flows", "originals"])
+
+
+def run_job(job: tuple[str, tuple[str, str]], cores: int = 1):
+    """
+    Run one analysis on one time range, writing its results to the usual output paths
+    :param job: name of the analysis and starting and ending date of the time range
+    :param cores: processes the analysis may start, for loading snapshots, training models and computing coherence
+    """
+    analysis, window = job
+    import snapshots
+    snapshots.LOAD_WORKERS = cores
+    if analysis == "lda":
+        os.chdir(TOPIC_MODELING_DIR)
+        sys.path.insert(0, TOPIC_MODELING_DIR)
+        import gensim_LDA
+        gensim_LDA.LDA_WORKERS = cores
+        gensim_LDA.COHERENCE_PROCESSES = cores
+        gensim_LDA.run_window(window)
+        return
+
+    os.chdir(BASE_DIR)
+    from utils import date_to_epoch, to_out_date, get_originals_data
+    from commonality import WORKING_DIR, SnapshotEquivalents, run_one_commons, get_cardinalities_stat
+    from flows import get_flows
+    if analysis == "cardinalities":
+        get_cardinalities_stat(window=window)
+    elif analysis == "linked":
+        run_one_commons(SnapshotEquivalents.LINKED, window=window)
+    elif analysis == "spacy":
+        run_one_commons(SnapshotEquivalents.SPACY, window=window)
+    elif analysis == "flows":
+        get_flows(window=window)
+    elif analysis == "originals":
+        get_originals_data(date_to_epoch(window[0]), date_to_epoch(window[1]), WORKING_DIR,
+                           start_date=to_out_date(window[0]), end_date=to_out_date(window[1]))
+
+
+def run_schedule(windows: list[tuple[str, str]], analyses: list[str] = None, workers: int = WORKERS,
+                 memory_slots: int = MEMORY_SLOTS) -> list[tuple]:
+    """
+    Run some analyses on several time ranges with a pool of processes. A job is started only when there is a free
+    worker and enough free memory slots for it, so that memory-heavy analyses do not oversubscribe RAM. Each job
+    runs in a fresh process that may start its own processes, as many as its share of the cores given by its slots
+    :param windows: list of starting and ending dates of the time ranges
+    :param analyses: analyses to be run, among ANALYSES. All of them if not given
+    :param workers: maximum number of jobs running together
+    :param memory_slots: memory slots available, see JOB_MEMORY
+    :return: list of the failed jobs with their errors
+    """
+    if analyses is None:
+        analyses = ANALYSES
+    for analysis in analyses:
+        if analysis not in JOB_MEMORY:
+            raise ValueError(f"Unknown analysis {analysis}")
+    pending = [(analysis, window) for window in windows for analysis in analyses]
+    total = len(pending)
+    failed = []
+    running = {}
+    used_slots = 0
+    completed = 0
+
+    # Pool workers are daemonic and cannot start processes, the workers of an executor can
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, max_tasks_per_child=1) as executor:
+        while pending or running:
+            # Start the pending jobs that fit, a job heavier than all the slots runs alone
+            for job in list(pending):
+                slots = min(JOB_MEMORY[job[0]], memory_slots)
+                if len(running) < workers and used_slots + slots <= memory_slots:
+                    pending.remove(job)
+                    used_slots += slots
+                    cores = max(1, (os.cpu_count() or 1) * slots // memory_slots)
+                    running[executor.submit(run_job, job, cores)] = job
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                used_slots -= min(JOB_MEMORY[job[0]], memory_slots)
+                completed += 1
+                error = future.exception()
+                status = "done" if error is None else f"failed: {error!r}"
+                print(f"[{completed}/{total}] {job[0]} {job[1][0]} - {job[1][1]} {status}")
+                if error is not None:
+                    failed.append((job, error))
+    return failed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import os
+import json
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left, bisect_right
+from enum import Enum
+from typing import Iterator
+from lazy_translation import make_lazy
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = f"{BASE_DIR}/../cache"
+CATALOG_DIR = f"{CACHE_DIR}/catalog"
+SNAPSHOT_CACHE_DIR = f"{CACHE_DIR}/snapshots"
+
+# Maximum size in bytes of the parsed snapshots cache, least recently used snapshots are evicted first
+SNAPSHOT_CACHE_BUDGET = 2 * 1024 ** 3
+USE_SNAPSHOT_CACHE = True
+
+# Number of processes used for loading snapshots, 1 loads them in the calling process
+LOAD_WORKERS = 1
+
+# In-process copy of the catalogs, keyed by language directory
+CATALOGS = {}
+
+# Size in bytes of the parsed snapshots cache, computed on first write
+SNAPSHOT_CACHE_USAGE = None
+
+
+class UseCarousels(Enum):
+    YES = 2
+    ONLY = 1
+    NO = 0
+
+
+def file_to_epoch(file: str) -> int:
+    """
+    Get the epoch encoded in a snapshot file name
+    :param file: name of the snapshot file
+    :return: epoch of the snapshot
+    """
+    return int(file.split("E")[1].split(".")[0])
+
+
+def get_catalog_path(lang_dir: str) -> str:
+    """
+    Get where the catalog of a language directory is persisted
+    :param lang_dir: directory of the snapshots of one language section
+    :return: path of the catalog file
+    """
+    lang_dir = os.path.abspath(lang_dir)
+    dir_name = os.path.basename(os.path.dirname(lang_dir))
+    lang = os.path.basename(lang_dir)
+    return f"{CATALOG_DIR}/{dir_name}_{lang}.json"
+
+
+def load_catalog(lang_dir: str) -> dict:
+    """
+    Load the persisted catalog of a language directory, or an empty one if it does not exist yet
+    :param lang_dir: directory of the snapshots of one language section
+    :return: catalog with the directory mtime, the sorted (epoch, path, size, mtime) entries and their epochs
+    """
+    catalog_path = get_catalog_path(lang_dir)
+    if not os.path.exists(catalog_path):
+        return {"dir_mtime": None, "entries": [], "epochs": []}
+    with open(catalog_path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    catalog["entries"] = [tuple(entry) for entry in catalog["entries"]]
+    catalog["epochs"] = [entry[0] for entry in catalog["entries"]]
+    return catalog
+
+
+def save_catalog(lang_dir: str, catalog: dict):
+    """
+    Persist the catalog of a language directory
+    :param lang_dir: directory of the snapshots of one language section
+    :param catalog: catalog to be saved
+    """
+    os.makedirs(CATALOG_DIR, exist_ok=True)
+    catalog_path = get_catalog_path(lang_dir)
+    # The temporary file is unique to the process, so concurrent refreshes do not replace each other's file
+    tmp_path = f"{catalog_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    os.replace(tmp_path, catalog_path)
+
+
+def refresh_catalog(lang_dir: str) -> list[tuple]:
+    """
+    Bring the catalog of a language directory up to date. The directory is listed only if its mtime changed
+    since the last refresh, and only the files that were not catalogued yet are inspected
+    :param lang_dir: directory of the snapshots of one language section
+    :return: entries (epoch, path, size, mtime) sorted by epoch
+    """
+    key = os.path.abspath(lang_dir)
+    if key not in CATALOGS:
+        CATALOGS[key] = load_catalog(lang_dir)
+    catalog = CATALOGS[key]
+
+    dir_mtime = os.stat(lang_dir).st_mtime
+    if catalog["dir_mtime"] == dir_mtime:
+        return catalog["entries"]
+
+    files = set(file for file in os.listdir(lang_dir) if file.endswith(".json"))
+    entries = [entry for entry in catalog["entries"] if entry[1] in files]
+    known = set(entry[1] for entry in entries)
+    for file in files - known:
+        stat = os.stat(f"{lang_dir}/{file}")
+        entries.append((file_to_epoch(file), file, stat.st_size, stat.st_mtime))
+    entries.sort()
+
+    catalog["dir_mtime"] = dir_mtime
+    catalog["entries"] = entries
+    catalog["epochs"] = [entry[0] for entry in entries]
+    save_catalog(lang_dir, {"dir_mtime": dir_mtime, "entries": entries})
+    return entries
+
+
+def get_window_files(dir_to_check: str, lang: str, start_epoch: float, end_epoch: float) -> list[tuple]:
+    """
+    Get the snapshots of a language section in a given time range
+    :param dir_to_check: directory of scraped items
+    :param lang: language section
+    :param start_epoch: start of the time range
+    :param end_epoch: end of the time range
+    :return: entries (epoch, filepath, size, mtime) in the time range, sorted by epoch
+    """
+    lang_dir = f"{dir_to_check}/{lang}"
+    entries = refresh_catalog(lang_dir)
+    catalog = CATALOGS[os.path.abspath(lang_dir)]
+    first = bisect_left(catalog["epochs"], start_epoch)
+    last = bisect_right(catalog["epochs"], end_epoch)
+    return [(epoch, f"{lang_dir}/{file}", size, mtime) for epoch, file, size, mtime in entries[first:last]]
+
+
+def get_cached_snapshot_path(filepath: str, size: int, mtime: float) -> str:
+    """
+    Get where the parsed version of a snapshot is cached. The key changes whenever the source file does
+    :param filepath: path of the JSON snapshot
+    :param size: size of the JSON snapshot
+    :param mtime: modification time of the JSON snapshot
+    :return: path of the cached snapshot
+    """
+    key = hashlib.sha1(f"{os.path.abspath(filepath)}:{size}:{mtime}".encode("utf-8")).hexdigest()
+    return f"{SNAPSHOT_CACHE_DIR}/{key}.pkl"
+
+
+def evict_snapshots(budget: int = SNAPSHOT_CACHE_BUDGET):
+    """
+    Remove the least recently used cached snapshots until the cache fits in the budget
+    :param budget: maximum size in bytes of the cache
+    """
+    global SNAPSHOT_CACHE_USAGE
+    cached = []
+    for entry in os.scandir(SNAPSHOT_CACHE_DIR):
+        if entry.name.endswith(".pkl"):
+            stat = entry.stat()
+            cached.append((stat.st_mtime, stat.st_size, entry.path))
+    cached.sort()
+    SNAPSHOT_CACHE_USAGE = sum(size for _, size, _ in cached)
+    for _, size, path in cached:
+        if SNAPSHOT_CACHE_USAGE <= budget:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        SNAPSHOT_CACHE_USAGE -= size
+
+
+def load_snapshot(filepath: str) -> list[dict]:
+    """
+    Load a snapshot, reading its parsed version from the cache when the source did not change since it was cached
+    :param filepath: path of the JSON snapshot
+    :return: list of items of the snapshot
+    """
+    if not USE_SNAPSHOT_CACHE:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    global SNAPSHOT_CACHE_USAGE
+    stat = os.stat(filepath)
+    cached_path = get_cached_snapshot_path(filepath, stat.st_size, stat.st_mtime)
+    try:
+        with open(cached_path, "rb") as f:
+            snapshot = pickle.load(f)
+        # Hits are touched so that eviction follows the last use
+        os.utime(cached_path)
+        return snapshot
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        pass
+
+    with open(filepath, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    os.makedirs(SNAPSHOT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=5)
+    os.replace(tmp_path, cached_path)
+
+    if SNAPSHOT_CACHE_USAGE is None:
+        evict_snapshots(SNAPSHOT_CACHE_BUDGET)
+    else:
+        SNAPSHOT_CACHE_USAGE += os.path.getsize(cached_path)
+        if SNAPSHOT_CACHE_USAGE > SNAPSHOT_CACHE_BUDGET:
+            evict_snapshots(SNAPSHOT_CACHE_BUDGET)
+    return snapshot
+
+
+def keep_carousel(item: dict, carousels: UseCarousels) -> bool:
+    """
+    Check if an item has to be kept given how carousels are handled
+    :param item: scraped item
+    :param carousels: how to handle carousels
+    :return: True if the item is kept, False otherwise
+    """
+    if carousels == UseCarousels.NO and item["carousel"]:
+        return False
+    if carousels == UseCarousels.ONLY and not item["carousel"]:
+        return False
+    return True
+
+
+def project_item(item: dict, fields: tuple = None) -> dict:
+    """
+    Keep only some fields of an item. Untranslated items are made lazy, so that they get translated only if their
+    english fields are read
+    :param item: scraped item
+    :param fields: fields to be kept, None for keeping the whole item. The item url and carousel flag are always kept
+    :return: the projected item
+    """
+    if fields is None:
+        projected = item
+    else:
+        projected = {field: item[field] for field in fields if field in item}
+        projected["item_url"] = item["item_url"]
+        projected["carousel"] = item["carousel"]
+    if "en_subtitle" not in item:
+        return make_lazy(projected, item)
+    return projected
+
+
+def iter_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch: float,
+                    carousels=UseCarousels.YES, fields: tuple = None) -> Iterator[dict]:
+    """
+    Lazily yield the deduplicated items of a language section in a given time range
+    :param dir_to_check: directory of scraped items
+    :param lang: language of items to be gathered
+    :param start_epoch: start of the time range
+    :param end_epoch: end of the time range
+    :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :return: iterator over the first occurrence of each item url, in snapshot order
+    """
+    urls = set()
+    for _, filepath, _, _ in get_window_files(dir_to_check, lang, start_epoch, end_epoch):
+        for new in load_snapshot(filepath):
+            if new["item_url"] in urls or not keep_carousel(new, carousels):
+                continue
+            urls.add(new["item_url"])
+            yield project_item(new, fields)
+
+
+def load_filtered_snapshot(task: tuple) -> list[dict]:
+    """
+    Load a snapshot keeping only the items that pass the carousel filter, to be run in a worker process
+    :param task: tuple of snapshot path, how to handle carousels and fields to be kept
+    :return: list of kept items, in snapshot order
+    """
+    filepath, carousels, fields = task
+    return [project_item(new, fields) for new in load_snapshot(filepath) if keep_carousel(new, carousels)]
+
+
+def load_dict_items(dir_to_check: str, langs: list[str], start_epoch: float, end_epoch: float,
+                    carousels=UseCarousels.YES, fields: tuple = None, workers: int = LOAD_WORKERS) -> dict:
+    """
+    Load the deduplicated items of several language sections, parsing the snapshots on a pool of processes.
+    The result is the same as loading each section one after another
+    :param dir_to_check: directory of scraped items
+    :param langs: language sections to be loaded
+    :param start_epoch: start of the time range
+    :param end_epoch: end of the time range
+    :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :param workers: number of processes to be used
+    :return: dict where keys are languages and values are their items
+    """
+    tasks = []
+    tasks_langs = []
+    for lang in langs:
+        for _, filepath, _, _ in get_window_files(dir_to_check, lang, start_epoch, end_epoch):
+            tasks.append((filepath, carousels, fields))
+            tasks_langs.append(lang)
+
+    items = {lang: [] for lang in langs}
+    urls = {lang: set() for lang in langs}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map keeps the order of the tasks, so deduplication keeps the first occurrence as the sequential loader does
+        for lang, news in zip(tasks_langs, pool.map(load_filtered_snapshot, tasks, chunksize=8)):
+            for new in news:
+                if new["item_url"] not in urls[lang]:
+                    urls[lang].add(new["item_url"])
+                    items[lang].append(new)
+    return items
+
+
+def scan_windows(dir_to_check: str, langs: list[str], windows_epochs: list[tuple[float, float]],
+                 variants: list, fields: tuple = None) -> list[dict]:
+    """
+    Load the items of several time ranges and ways of handling carousels reading each needed snapshot only once,
+    then slice them by time range and deduplicate them for every way of handling carousels in the same pass
+    :param dir_to_check: directory of scraped items
+    :param langs: language sections to be loaded
+    :param windows_epochs: list of (start, end) epochs of the time ranges
+    :param variants: ways of handling carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :return: for each time range, a dict where keys are the ways of handling carousels and values are dicts where
+    keys are languages and values are their deduplicated items, the same that get_dict_items would return.
+    Items are shared between time ranges and ways of handling carousels
+    """
+    windows_variants = [{carousels: {lang: [] for lang in langs} for carousels in variants} for _ in windows_epochs]
+    for lang in langs:
+        needed = {}
+        for start_epoch, end_epoch in windows_epochs:
+            for epoch, filepath, _, _ in get_window_files(dir_to_check, lang, start_epoch, end_epoch):
+                needed[filepath] = epoch
+        files = sorted((epoch, filepath) for filepath, epoch in needed.items())
+        epochs = [epoch for epoch, _ in files]
+        snapshots = [load_filtered_snapshot((filepath, UseCarousels.YES, fields)) for _, filepath in files]
+
+        for window_variants, (start_epoch, end_epoch) in zip(windows_variants, windows_epochs):
+            urls = {carousels: set() for carousels in variants}
+            for news in snapshots[bisect_left(epochs, start_epoch):bisect_right(epochs, end_epoch)]:
+                for new in news:
+                    for carousels in variants:
+                        if new["item_url"] not in urls[carousels] and keep_carousel(new, carousels):
+                            urls[carousels].add(new["item_url"])
+                            window_variants[carousels][lang].append(new)
+    return windows_variants
+
+
+def load_windows_items(dir_to_check: str, langs: list[str], windows_epochs: list[tuple[float, float]],
+                       carousels=UseCarousels.YES, fields: tuple = None) -> list[dict]:
+    """
+    Load the items of several time ranges reading each needed snapshot only once, then slice them by time range
+    :param dir_to_check: directory of scraped items
+    :param langs: language sections to be loaded
+    :param windows_epochs: list of (start, end) epochs of the time ranges
+    :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :return: for each time range, a dict where keys are languages and values are their deduplicated items,
+    the same that get_dict_items would return. Items of overlapping time ranges are shared
+    """
+    windows_variants = scan_windows(dir_to_check, langs, windows_epochs, [carousels], fields)
+    return [window_variants[carousels] for window_variants in windows_variants]
+
+
+def load_windows_variants(dir_to_check: str, langs: list[str], windows_epochs: list[tuple[float, float]],
+                          fields: tuple = None) -> list[dict]:
+    """
+    Load the items of several time ranges for every way of handling carousels, in a single pass
+    :param dir_to_check: directory of scraped items
+    :param langs: language sections to be loaded
+    :param windows_epochs: list of (start, end) epochs of the time ranges
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :return: for each time range, a dict where keys are the ways of handling carousels and values are the items
+    grouped by language section
+    """
+    return scan_windows(dir_to_check, langs, windows_epochs, list(UseCarousels), fields)
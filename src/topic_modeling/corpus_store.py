@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import numpy as np
+import gensim.corpora as corpora
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_STORE_DIR = f"{BASE_DIR}/../../cache/corpus"
+# Format of the stores, part of their directory so that stores written in another format are never read
+STORE_FORMAT = 2
+
+# Stores opened in this process by name: global dictionary, rows of the stored articles by key and token ids
+STORES = {}
+
+# Seconds between attempts to take the lock of a store, and after which a lock is assumed to be left by a crashed
+# process
+LOCK_RETRY = 0.05
+LOCK_TIMEOUT = 600
+
+
+def get_store_dir(name: str) -> str:
+    """
+    Get where a corpus store is persisted
+    :param name: name of the store, one for each language and preprocessing
+    :return: directory of the store
+    """
+    return f"{CORPUS_STORE_DIR}/{name}_v{STORE_FORMAT}"
+
+
+def map_array(path: str) -> np.ndarray:
+    """
+    Memory-map the append-only array of the store
+    :param path: path of the array
+    :return: the mapped array, empty if the file does not exist yet
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode="r")
+
+
+@contextmanager
+def lock_store(store_dir: str):
+    """
+    Hold the lock of a store, so that a single process at a time adds articles to it. The lock is a file created
+    exclusively, which works the same on every platform
+    :param store_dir: directory of the store
+    """
+    lock_path = f"{store_dir}/lock"
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_TIMEOUT:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(LOCK_RETRY)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+def load_corpus_store(name: str) -> dict:
+    """
+    Load a corpus store from disk. The index is read first and the tokens last, since they are written in the
+    opposite order, so every row of the index is in the tokens and every token id is in the dictionary
+    :param name: name of the store
+    :return: the store, with its global dictionary, the rows of each stored article and the token ids of all the
+    stored articles
+    """
+    store_dir = get_store_dir(name)
+    if os.path.exists(f"{store_dir}/index.json"):
+        with open(f"{store_dir}/index.json", "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        dictionary = corpora.Dictionary.load(f"{store_dir}/dictionary.dict")
+    else:
+        rows = {}
+        dictionary = corpora.Dictionary()
+    return {"dictionary": dictionary, "rows": rows, "tokens": map_array(f"{store_dir}/tokens.i32")}
+
+
+def open_corpus_store(name: str) -> dict:
+    """
+    Load a corpus store, if it was not done yet in this process. Articles added by other processes afterwards are
+    seen once this process adds articles itself
+    :param name: name of the store
+    :return: the store, with its global dictionary, the rows of each stored article and the token ids of all the
+    stored articles
+    """
+    if name not in STORES:
+        STORES[name] = load_corpus_store(name)
+    return STORES[name]
+
+
+def get_stored_tokens(name: str, keys: list[str]) -> list:
+    """
+    Get the stored words of some articles, as ids of the global dictionary of the store in the order of the words
+    :param name: name of the store
+    :param keys: keys of the articles
+    :return: for each article its token ids, or None if it is not stored
+    """
+    store = open_corpus_store(name)
+    tokens = []
+    for key in keys:
+        row = store["rows"].get(key)
+        if row is None:
+            tokens.append(None)
+        else:
+            start, end = row
+            tokens.append(np.array(store["tokens"][start:end]))
+    return tokens
+
+
+def add_texts(name: str, keys: list[str], data_words: list[list[str]]):
+    """
+    Add the words of some articles to a store, growing its global dictionary. Ids already in the dictionary never
+    change, so the stored token ids stay valid. Many processes can add articles to the same store: each one takes its
+    lock and reloads the store from disk, so it appends after the rows and extends the dictionary written by the
+    others, and articles they already added are skipped
+    :param name: name of the store
+    :param keys: keys of the articles
+    :param data_words: words of each article
+    """
+    if not keys:
+        return
+    store_dir = get_store_dir(name)
+    os.makedirs(store_dir, exist_ok=True)
+    with lock_store(store_dir):
+        store = load_corpus_store(name)
+        # Tokens left by a process that crashed before writing the index are skipped
+        start = len(map_array(f"{store_dir}/tokens.i32"))
+        tokens = []
+        for key, words in zip(keys, data_words):
+            if key in store["rows"]:
+                continue
+            store["dictionary"].doc2bow(words, allow_update=True)
+            store["rows"][key] = [start + len(tokens), start + len(tokens) + len(words)]
+            tokens.extend(store["dictionary"].token2id[word] for word in words)
+
+        # Tokens are written before the dictionary and the index, so the index never points to missing rows or ids
+        with open(f"{store_dir}/tokens.i32", "ab") as f:
+            f.write(np.asarray(tokens, dtype=np.int32).tobytes())
+        tmp_suffix = f"{os.getpid()}.tmp"
+        store["dictionary"].save(f"{store_dir}/dictionary.dict.{tmp_suffix}")
+        os.replace(f"{store_dir}/dictionary.dict.{tmp_suffix}", f"{store_dir}/dictionary.dict")
+        with open(f"{store_dir}/index.json.{tmp_suffix}", "w", encoding="utf-8") as f:
+            json.dump(store["rows"], f)
+        os.replace(f"{store_dir}/index.json.{tmp_suffix}", f"{store_dir}/index.json")
+
+        store["tokens"] = map_array(f"{store_dir}/tokens.i32")
+        STORES[name] = store
+
+
+def tokens_to_bow(token_ids: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Count the token ids of an article
+    :param token_ids: token ids of the article
+    :return: its bag of words, sorted by id like the ones of corpora.Dictionary.doc2bow
+    """
+    ids, counts = np.unique(token_ids, return_counts=True)
+    return list(zip(ids.tolist(), counts.tolist()))
+
+
+def tokens_to_texts(name: str, tokens: list[np.ndarray]) -> list[list[str]]:
+    """
+    Rebuild the words of some articles from their stored token ids, in their original order, without tokenizing
+    them again
+    :param name: name of the store
+    :param tokens: token ids of each article in the global dictionary of the store
+    :return: words of each article
+    """
+    dictionary = open_corpus_store(name)["dictionary"]
+    return [[dictionary[token_id] for token_id in token_ids.tolist()] for token_ids in tokens]
@@ -1,21 +1,28 @@
-import en_core_web_sm
 import os
+import time
+import random
 import gensim
+import pandas as pd
 import re
 import pyLDAvis
 import pyLDAvis.gensim
 import gensim.corpora as corpora
 import matplotlib.pyplot as plt
 from pprint import pprint
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
 from nltk.corpus import stopwords
 from gensim.utils import simple_preprocess
-from utils import get_dict_items, get_originals_data
+from utils import get_dict_items, get_originals_data, load_windows_items
 from utils import NEWS_DIR, TRANSLATED_NEWS_DIR, UseCarousels
-from utils import date_to_epoch
+from utils import date_to_epoch, to_out_date, get_out_path
+from lazy_translation import translate_items
+from models import get_model
+from ner_cache import get_ner_key, get_stored_words, add_words
+from corpus_store import open_corpus_store, get_stored_tokens, add_texts, tokens_to_bow, tokens_to_texts
 import json
 
 # nltk.download('stopwords')
-nlp = en_core_web_sm.load()
 
 WORKING_DIR = TRANSLATED_NEWS_DIR
 
@@ -33,90 +40,449 @@ START_END_DATES = [(f"2023-11-{day} 16:15:00", f"2023-11-{day} 16:29:00") for da
 
 NUM_TOPICS = 5
 
+# Processes training a model with LdaMulticore, None for one less than the number of cores
+LDA_WORKERS = None
+
 USE_ORIGINALS = False
 
 USE_NER = True
 
+# Batch size and number of processes used by SpaCy for the NER preprocessing
+NER_BATCH_SIZE = 64
+NER_PROCESSES = 1
+
+# Read the words of the articles from the corpus store, preprocessing only the articles never seen before
+USE_CORPUS_STORE = True
+
+# Train one model for each language across all the time ranges, updating it with the new articles of each one
+INCREMENTAL = False
+# Compare every updated model with a model trained from scratch on the same time range. This trains a second model
+# for every time range, so it is only meant for checking the incremental models, not for regular runs
+COMPARE_COLD = False
+INCREMENTAL_DIR = "../../cache/lda"
+
+# How topic models are evaluated: "skip", "u_mass" from the bags of words, or "c_v" on a sample of articles
+COHERENCE_MODE = "c_v"
+# Number of articles c_v is computed on, None for all of them. Sampling makes c_v faster but noisier, so it is opt-in
+COHERENCE_SAMPLE = None
+COHERENCE_SEED = 0
+COHERENCE_PROCESSES = max(1, (os.cpu_count() or 1) - 1)
+
+# Grid of the hyperparameters sweep, every combination is trained on the START_DATE - END_DATE time range
+SWEEP = False
+SWEEP_NUM_TOPICS = [3, 5, 8, 10, 15, 20]
+SWEEP_ALPHAS = ["symmetric", "asymmetric", 0.1]
+SWEEP_ETAS = [None, 0.01]
+SWEEP_WORKERS = os.cpu_count()
+
+# Corpus shared by the models trained in a sweep worker process, set once when the process starts
+SWEEP_DATA = {}
+
 
 def main():
-    for start, end in START_END_DATES:
-        global START_DATE, END_DATE, START_EPOCH, END_EPOCH, OUT_START_DATE, OUT_END_DATE, OUT_PATH
-        START_DATE = start
-        END_DATE = end
-        START_EPOCH = date_to_epoch(START_DATE)
-        END_EPOCH = date_to_epoch(END_DATE)
-        OUT_START_DATE = START_DATE.replace(' ', 'T').replace(':', '.')
-        OUT_END_DATE = END_DATE.replace(' ', 'T').replace(':', '.')
-        OUT_PATH = f"{OUT_START_DATE}_{OUT_END_DATE}"
-        print(f"Processing {OUT_PATH}")
-        models = full_pipe()
-        for lang in models.keys():
-            LDAvis_prepared = pyLDAvis.gensim.prepare(models[lang]["model"], models[lang]["corpus"],
-                                                      models[lang]["id2word"], sort_topics=False)
-            pyLDAvis.save_html(LDAvis_prepared,
-                               f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
-                               f"{'originals_' if USE_ORIGINALS else ''}{OUT_PATH}.html")
-            pyLDAvis.save_json(LDAvis_prepared, f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
-                               f"{'originals_' if USE_ORIGINALS else ''}{OUT_PATH}.json")
-            with open(f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
-                               f"{'originals_' if USE_ORIGINALS else ''}{OUT_PATH}.json", "r") as f:
-                curr_json = json.load(f)
-            print(curr_json["tinfo"]["Term"][:10])
-
-
-def full_pipe(use_originals=USE_ORIGINALS, use_NER=USE_NER):
-    if use_originals:
-        news_dict = get_originals_data(START_EPOCH, END_EPOCH, WORKING_DIR, carousels=UseCarousels.NO,
-                                       start_date=OUT_START_DATE, end_date=OUT_END_DATE)["data"]
-    else:
-        news_dict = get_dict_items(START_EPOCH, END_EPOCH, WORKING_DIR, carousels=UseCarousels.NO)
-    if use_NER:
-        data_words = ner_preprocessing(news_dict)
-    else:
-        news_dict = re_preprocessing(news_dict)
-        data_words = nltk_preprocessing(news_dict)
-    # print(data_words)
-    output = {lang: {"model": None, "corpus": None, "id2word": None} for lang in data_words.keys()}
-    for lang in data_words.keys():
-        corpus, id2word = to_tdf(data_words[lang])
-        lda_model = gensim.models.LdaMulticore(corpus=corpus,
-                                               id2word=id2word,
-                                               num_topics=NUM_TOPICS,
-                                               random_state=100,
-                                               chunksize=100,
-                                               passes=10,
-                                               per_word_topics=True)
+    if SWEEP:
+        run_sweep()
+        return
+    # Snapshots are read once for all the windows
+    windows_epochs = [(date_to_epoch(start), date_to_epoch(end)) for start, end in START_END_DATES]
+    windows_items = load_windows_items(WORKING_DIR, LANGS, windows_epochs, UseCarousels.NO)
+    if INCREMENTAL:
+        comparison = run_incremental(START_END_DATES, windows_items)
+        with open(f"{INCREMENTAL_DIR}/{'NER_' if USE_NER else ''}{'originals_' if USE_ORIGINALS else ''}"
+                  f"comparison.json", "w", encoding="utf-8") as f:
+            json.dump(comparison, f, indent=4)
+        return
+    for window, news_dict in zip(START_END_DATES, windows_items):
+        run_window(window, news_dict)
+
+
+def run_window(window: tuple, news_dict: dict = None):
+    out_path = get_out_path(window)
+    print(f"Processing {out_path}")
+    models = full_pipe(news_dict=news_dict, window=window)
+    for lang in models.keys():
+        start = time.time()
+        LDAvis_prepared = pyLDAvis.gensim.prepare(models[lang]["model"], models[lang]["corpus"],
+                                                  models[lang]["id2word"], sort_topics=False)
+        pyLDAvis.save_html(LDAvis_prepared,
+                           f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
+                           f"{'originals_' if USE_ORIGINALS else ''}{out_path}.html")
+        pyLDAvis.save_json(LDAvis_prepared, f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
+                           f"{'originals_' if USE_ORIGINALS else ''}{out_path}.json")
+        with open(f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
+                           f"{'originals_' if USE_ORIGINALS else ''}{out_path}.json", "r") as f:
+            curr_json = json.load(f)
+        print(curr_json["tinfo"]["Term"][:10])
+        models[lang]["timings"]["visualization"] = time.time() - start
+        print("Timings:", ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in models[lang]["timings"].items()))
+        with open(f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
+                  f"{'originals_' if USE_ORIGINALS else ''}{out_path}_timings.json", "w") as f:
+            json.dump(models[lang]["timings"], f, indent=4)
+
+
+def full_pipe(use_originals=USE_ORIGINALS, use_NER=USE_NER, news_dict: dict = None, window: tuple = None):
+    start = time.time()
+    window_words = get_window_words(use_originals, use_NER, news_dict, window)
+    preprocessing_time = time.time() - start
+    # print(window_words)
+    output = {lang: {"model": None, "corpus": None, "id2word": None, "timings": None} for lang in window_words.keys()}
+    for lang in window_words.keys():
+        # Preprocessing is done for all the languages together, its time is the same for each of them
+        timings = {"preprocessing": preprocessing_time}
+        start = time.time()
+        corpus, id2word, texts = to_corpus(lang, window_words[lang], use_NER)
+        timings["corpus"] = time.time() - start
+        start = time.time()
+        lda_model = train_model(corpus, id2word)
+        timings["training"] = time.time() - start
         pprint(lda_model.print_topics())
         doc_lda = lda_model[corpus]
+        start = time.time()
         print('\nPerplexity: ', lda_model.log_perplexity(corpus))
-        coherence_model_lda = gensim.models.CoherenceModel(model=lda_model, texts=data_words[lang], dictionary=id2word,
-                                                           coherence='c_v')
-        coherence_lda = coherence_model_lda.get_coherence()
+        timings["perplexity"] = time.time() - start
+        start = time.time()
+        coherence_lda = get_coherence(lda_model, corpus, texts, id2word)
+        timings["coherence"] = time.time() - start
         print('\nCoherence Score: ', coherence_lda)
         output[lang]["model"] = lda_model
         output[lang]["corpus"] = corpus
         output[lang]["id2word"] = id2word
+        output[lang]["timings"] = timings
     return output
 
 
+def get_coherence(lda_model, corpus: list, texts: list, id2word, mode: str = None,
+                  processes: int = None):
+    """
+    Evaluate the coherence of a model
+    :param lda_model: model to be evaluated
+    :param corpus: bag of words of each article
+    :param texts: words of each article
+    :param id2word: dictionary of the corpus
+    :param mode: "skip", "u_mass" computed from the bags of words, or "c_v" computed on a sample of
+    COHERENCE_SAMPLE articles. COHERENCE_MODE if not given
+    :param processes: processes used for c_v, COHERENCE_PROCESSES if not given
+    :return: the coherence, None if skipped
+    """
+    if mode is None:
+        mode = COHERENCE_MODE
+    if processes is None:
+        processes = COHERENCE_PROCESSES
+    if mode == "skip":
+        return None
+    if mode == "u_mass":
+        return gensim.models.CoherenceModel(model=lda_model, corpus=corpus, dictionary=id2word,
+                                            coherence='u_mass').get_coherence()
+    if mode == "c_v":
+        if COHERENCE_SAMPLE is not None and len(texts) > COHERENCE_SAMPLE:
+            # The sample is the same at every run
+            sample = sorted(random.Random(COHERENCE_SEED).sample(range(len(texts)), COHERENCE_SAMPLE))
+            texts = [texts[i] for i in sample]
+        return gensim.models.CoherenceModel(model=lda_model, texts=texts, dictionary=id2word, coherence='c_v',
+                                            processes=processes).get_coherence()
+    raise ValueError(f"Unknown coherence mode {mode}")
+
+
+def get_window_words(use_originals=USE_ORIGINALS, use_NER=USE_NER, news_dict: dict = None,
+                     window: tuple = None) -> dict:
+    """
+    Get the preprocessed words of the articles of a time range, as token ids when they are read from the corpus store
+    :param use_originals: whether to keep only the original articles
+    :param use_NER: whether to preprocess with NER, or with stopwords removal
+    :param news_dict: already loaded articles of the time range, loaded here if not given
+    :param window: starting and ending date of the time range
+    :return: dict where keys are languages and values are, for each article, its token ids in the global
+    dictionary of the store with USE_CORPUS_STORE, its list of words otherwise
+    """
+    if USE_CORPUS_STORE:
+        return get_window_tokens(use_originals, use_NER, news_dict, window)[0]
+    return preprocess(get_window_articles(use_originals, news_dict, window), use_NER)
+
+
+def to_corpus(lang: str, words: list, use_NER=USE_NER) -> tuple:
+    """
+    Build the corpus of the articles of a language. Stored token ids are turned into a corpus directly, without
+    going through the words of the articles
+    :param lang: language section
+    :param words: words of each article, as given by get_window_words
+    :param use_NER: whether articles are preprocessed with NER
+    :return: the bag of words of each article, the dictionary of the corpus and the words of each article in their
+    original order
+    """
+    if not USE_CORPUS_STORE:
+        return (*to_tdf(words), words)
+    name = get_store_name(lang, use_NER)
+    corpus, id2word = ids_to_tdf(words, open_corpus_store(name)["dictionary"])
+    return corpus, id2word, tokens_to_texts(name, words)
+
+
+def get_window_articles(use_originals=USE_ORIGINALS, news_dict: dict = None, window: tuple = None) -> dict:
+    """
+    Get the translated articles of a time range
+    :param use_originals: whether to keep only the original articles
+    :param news_dict: already loaded articles of the time range, loaded here if not given
+    :param window: starting and ending date of the time range
+    :return: dict where keys are languages and values are their articles
+    """
+    if window is None:
+        window = (START_DATE, END_DATE)
+    start_epoch, end_epoch = date_to_epoch(window[0]), date_to_epoch(window[1])
+    if news_dict is None:
+        news_dict = get_dict_items(start_epoch, end_epoch, WORKING_DIR, carousels=UseCarousels.NO)
+    if use_originals:
+        news_dict = get_originals_data(start_epoch, end_epoch, WORKING_DIR, carousels=UseCarousels.NO,
+                                       start_date=to_out_date(window[0]), end_date=to_out_date(window[1]),
+                                       items=news_dict)["data"]
+    # Untranslated items are translated here in one batch rather than one by one when their content is read
+    for lang in news_dict.keys():
+        translate_items(news_dict[lang])
+    return news_dict
+
+
+def preprocess(news_dict: dict, use_NER=USE_NER) -> dict:
+    """
+    Get the words of some articles
+    :param news_dict: dict where keys are languages and values are their articles
+    :param use_NER: whether to preprocess with NER, or with stopwords removal
+    :return: dict where keys are languages and values are the list of words of each article
+    """
+    if use_NER:
+        return ner_preprocessing(news_dict)
+    return nltk_preprocessing(re_preprocessing(dict(news_dict)))
+
+
+def get_store_name(lang: str, use_NER=USE_NER) -> str:
+    """
+    Get the name of the corpus store of a language and preprocessing
+    :param lang: language section
+    :param use_NER: whether articles are preprocessed with NER
+    :return: name of the store
+    """
+    return f"{'NER' if use_NER else 'nltk'}_{lang}"
+
+
+def get_window_tokens(use_originals=USE_ORIGINALS, use_NER=USE_NER, news_dict: dict = None,
+                      window: tuple = None) -> tuple[dict, dict, dict]:
+    """
+    Get the words of the articles of a time range from the corpus store. Only the articles never stored before are
+    preprocessed and added to the store
+    :param use_originals: whether to keep only the original articles
+    :param use_NER: whether to preprocess with NER, or with stopwords removal
+    :param news_dict: already loaded articles of the time range, loaded here if not given
+    :param window: starting and ending date of the time range
+    :return: dicts where keys are languages and values are the token ids, in the global dictionary of the language
+    and in the order of the words, the url and the store key of each article
+    """
+    news_dict = get_window_articles(use_originals, news_dict, window)
+    tokens = {}
+    urls = {}
+    window_keys = {}
+    for lang in news_dict.keys():
+        name = get_store_name(lang, use_NER)
+        keys = [get_ner_key(article["item_url"], article["en_content"]) for article in news_dict[lang]]
+        stored = get_stored_tokens(name, keys)
+        missing = {key: article for key, article, token_ids in zip(keys, news_dict[lang], stored) if token_ids is None}
+        if missing:
+            add_texts(name, list(missing.keys()), preprocess({lang: list(missing.values())}, use_NER)[lang])
+            stored = get_stored_tokens(name, keys)
+        tokens[lang] = stored
+        urls[lang] = [article["item_url"] for article in news_dict[lang]]
+        window_keys[lang] = keys
+    return tokens, urls, window_keys
+
+
+def run_incremental(windows: list[tuple], windows_items: list[dict] = None, compare_cold: bool = COMPARE_COLD) \
+        -> dict:
+    """
+    Train one topic model for each language across consecutive time ranges: the first time range trains it from
+    scratch, then each following one updates it online with only the articles never seen before, an article whose
+    content changed counting as a new one. Time ranges before the first one with articles are skipped. All the models
+    of a language share the global dictionary of its corpus store, and the state of each model after every time
+    range is saved
+    :param windows: starting and ending dates of the time ranges, in chronological order
+    :param windows_items: already loaded articles of each time range, loaded here if not given
+    :param compare_cold: whether to also train a model from scratch on each time range and compare it with the
+    updated one
+    :return: dict where keys are languages and values are, for each time range, the perplexity of the updated model
+    and, if compared, the perplexity of the cold model and the mean topic distance between the two
+    """
+    if windows_items is None:
+        windows_items = [None] * len(windows)
+    # All the articles are stored before training, so the global dictionaries do not change during training
+    windows_tokens = [get_window_tokens(news_dict=news_dict, window=window)
+                      for window, news_dict in zip(windows, windows_items)]
+
+    comparison = {}
+    for lang in sorted({lang for tokens, _, _ in windows_tokens for lang in tokens.keys()}):
+        id2word = open_corpus_store(get_store_name(lang))["dictionary"]
+
+        lda_model = None
+        seen = set()
+        comparison[lang] = {}
+        os.makedirs(f"{INCREMENTAL_DIR}/{lang}", exist_ok=True)
+        for window, (tokens, _, keys) in zip(windows, windows_tokens):
+            out_path = get_out_path(window)
+            corpus = [tokens_to_bow(token_ids) for token_ids in tokens.get(lang, [])]
+            # Articles are keyed by url and content, so an article edited in place updates the model again
+            new_corpus = [bow for key, bow in zip(keys.get(lang, []), corpus) if key not in seen]
+            seen.update(keys.get(lang, []))
+            if lda_model is None:
+                if not any(new_corpus):
+                    # A model cannot be trained on an empty corpus, the first model is trained by the next time range
+                    print(lang, out_path, "no articles, skipped")
+                    continue
+                lda_model = train_model(new_corpus, id2word)
+            elif new_corpus:
+                lda_model.update(new_corpus)
+            lda_model.save(f"{INCREMENTAL_DIR}/{lang}/{'NER_' if USE_NER else ''}"
+                           f"{'originals_' if USE_ORIGINALS else ''}{out_path}.model")
+
+            window_comparison = {"new_docs": len(new_corpus),
+                                 "perplexity": float(lda_model.log_perplexity(corpus)) if any(corpus) else None}
+            if compare_cold and any(corpus):
+                cold_model = train_model(corpus, id2word)
+                mdiff, _ = lda_model.diff(cold_model, distance="jaccard", num_words=50, annotation=False)
+                window_comparison["cold_perplexity"] = float(cold_model.log_perplexity(corpus))
+                # Distance of each updated topic from its closest cold topic
+                window_comparison["topic_distance"] = float(mdiff.min(axis=1).mean())
+            print(lang, out_path, window_comparison)
+            comparison[lang][out_path] = window_comparison
+    return comparison
+
+
+def run_sweep(window: tuple = None, news_dict: dict = None, workers: int = SWEEP_WORKERS) -> dict:
+    """
+    Train a model for every combination of number of topics, alpha and eta on the same corpus, on a pool of
+    processes, and rank them by coherence, or by perplexity if coherence is skipped. The ranked table of each
+    language is saved as CSV
+    :param window: starting and ending date of the time range
+    :param news_dict: already loaded articles of the time range, loaded here if not given
+    :param workers: number of processes training models
+    :return: dict where keys are languages and values are their ranked tables
+    """
+    if window is None:
+        window = (START_DATE, END_DATE)
+    window_words = get_window_words(news_dict=news_dict, window=window)
+    grid = list(product(SWEEP_NUM_TOPICS, SWEEP_ALPHAS, SWEEP_ETAS))
+    tables = {}
+    for lang in window_words.keys():
+        # The corpus is sent once to each process, not once for each model
+        with ProcessPoolExecutor(workers, initializer=init_sweep_worker,
+                                 initargs=to_corpus(lang, window_words[lang])) as executor:
+            rows = list(executor.map(evaluate_params, grid))
+        rank_by = "perplexity" if COHERENCE_MODE == "skip" else "coherence"
+        table = pd.DataFrame(rows).sort_values(rank_by, ascending=False, ignore_index=True)
+        table.index += 1
+        print(lang)
+        print(table.to_string())
+        table.to_csv(f"../visualization/topic_modeling/{lang}/{'NER_' if USE_NER else ''}"
+                     f"{'originals_' if USE_ORIGINALS else ''}sweep_{get_out_path(window)}.csv", index_label="rank")
+        tables[lang] = table
+    return tables
+
+
+def init_sweep_worker(corpus: list, id2word, texts: list):
+    """
+    Keep the corpus of a sweep in the worker process
+    :param corpus: bag of words of each article
+    :param id2word: dictionary of the corpus
+    :param texts: words of each article, for coherence
+    """
+    SWEEP_DATA["corpus"] = corpus
+    SWEEP_DATA["id2word"] = id2word
+    SWEEP_DATA["texts"] = texts
+
+
+def evaluate_params(params: tuple) -> dict:
+    """
+    Train and evaluate a model of a sweep on the corpus of the worker process
+    :param params: number of topics, alpha and eta
+    :return: the parameters with the perplexity, coherence and training time of the model
+    """
+    num_topics, alpha, eta = params
+    start = time.time()
+    # Models are trained on a single core, the sweep is parallel across models
+    lda_model = gensim.models.LdaModel(corpus=SWEEP_DATA["corpus"],
+                                       id2word=SWEEP_DATA["id2word"],
+                                       num_topics=num_topics,
+                                       alpha=alpha,
+                                       eta=eta,
+                                       random_state=100,
+                                       chunksize=100,
+                                       passes=10)
+    train_time = time.time() - start
+    start = time.time()
+    # The sweep is already parallel across models, so coherence runs in the worker process
+    coherence = get_coherence(lda_model, SWEEP_DATA["corpus"], SWEEP_DATA["texts"], SWEEP_DATA["id2word"],
+                              processes=1)
+    coherence_time = time.time() - start
+    return {"num_topics": num_topics, "alpha": str(alpha), "eta": str(eta),
+            "perplexity": float(lda_model.log_perplexity(SWEEP_DATA["corpus"])),
+            "coherence": float(coherence) if coherence is not None else None, "train_time": train_time,
+            "coherence_time": coherence_time}
+
+
+def train_model(corpus: list, id2word):
+    """
+    Train a topic model from scratch
+    :param corpus: bag of words of each article
+    :param id2word: dictionary of the corpus
+    :return: the trained model
+    """
+    return gensim.models.LdaMulticore(corpus=corpus,
+                                      id2word=id2word,
+                                      num_topics=NUM_TOPICS,
+                                      workers=LDA_WORKERS,
+                                      random_state=100,
+                                      chunksize=100,
+                                      passes=10,
+                                      per_word_topics=True)
+
+
 def ner_preprocessing(news_dict: dict) -> dict:
-    data_words = {lang: [] for lang in news_dict.keys()}
+    """
+    Get the entities and lemmas of the articles. Articles are read from the cache, and only the ones never seen
+    before are processed, all together with nlp.pipe
+    :param news_dict: dict where keys are languages and values are their articles
+    :return: dict where keys are languages and values are the list of words of each article
+    """
+    keys = {lang: [get_ner_key(article["item_url"], article["en_content"]) for article in news_dict[lang]]
+            for lang in news_dict.keys()}
+    stored = {lang: get_stored_words(keys[lang]) for lang in news_dict.keys()}
+    to_process = {}
     for lang in news_dict.keys():
-        corpus = [article["en_content"] for article in news_dict[lang]]
-        i = 0
-        for text in corpus:
-            data_words[lang].append([])
-            doc = nlp(text)
-            for ent in doc.ents:
-                if ent.label_ != "ORDINAL" and ent.label_ != "QUANTITY" and ent.label_ != "CARDINAL" \
-                        and ent.label_ != "PERCENT":
-                    data_words[lang][i].append(ent.text)
-            for token in doc:
-                if (token.pos_ == "NOUN" or token.pos_ == "VBZ" or token.pos_ == "VBG"
-                        and token.lemma_ not in data_words[lang][i]):
-                    data_words[lang][i].append(token.lemma_)
-            i += 1
-    return data_words
+        for article, key, words in zip(news_dict[lang], keys[lang], stored[lang]):
+            if words is None:
+                to_process[key] = article["en_content"]
+
+    new_words = {}
+    if to_process:
+        # The dependency parser is not needed for entities, part of speech tags and lemmas
+        docs = get_model("spacy_sm").pipe(to_process.values(), batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES,
+                                          disable=["parser"])
+        new_words = {key: get_doc_words(doc) for key, doc in zip(to_process.keys(), docs)}
+        add_words(new_words)
+
+    return {lang: [words if words is not None else new_words[key] for key, words in zip(keys[lang], stored[lang])]
+            for lang in news_dict.keys()}
+
+
+def get_doc_words(doc) -> list[str]:
+    """
+    Get the entities and lemmas of a processed article
+    :param doc: article processed by SpaCy
+    :return: the entities that are not numbers, followed by the lemmas of the nouns
+    """
+    words = []
+    for ent in doc.ents:
+        if ent.label_ != "ORDINAL" and ent.label_ != "QUANTITY" and ent.label_ != "CARDINAL" \
+                and ent.label_ != "PERCENT":
+            words.append(ent.text)
+    for token in doc:
+        if (token.pos_ == "NOUN" or token.pos_ == "VBZ" or token.pos_ == "VBG"
+                and token.lemma_ not in words):
+            words.append(token.lemma_)
+    return words
 
 
 def re_preprocessing(news_dict: dict) -> dict:
@@ -171,6 +537,29 @@ def to_tdf(data_words: list) -> list:
     return corpus, id2word
 
 
+def ids_to_tdf(tokens: list, dictionary) -> tuple:
+    """
+    Build the corpus of some articles from their token ids in a global dictionary, without going through their
+    words. Ids are renumbered in the order corpora.Dictionary numbers words, so the corpus and its dictionary are the
+    same as the ones to_tdf builds from the words of the articles
+    :param tokens: token ids of each article
+    :param dictionary: global dictionary the token ids refer to
+    :return: the bag of words of each article and the dictionary of the corpus
+    """
+    window_ids = {}
+    corpus = []
+    for token_ids in tokens:
+        bow = tokens_to_bow(token_ids)
+        # corpora.Dictionary numbers the new words of each article in alphabetical order
+        for token_id in sorted((token_id for token_id, _ in bow if token_id not in window_ids),
+                               key=lambda token_id: dictionary[token_id]):
+            window_ids[token_id] = len(window_ids)
+        corpus.append(sorted((window_ids[token_id], count) for token_id, count in bow))
+    id2word = corpora.Dictionary.from_corpus(corpus, {window_id: dictionary[token_id]
+                                                      for token_id, window_id in window_ids.items()})
+    return corpus, id2word
+
+
 def compute_differences(first_model, second_model):
     mdiff, annotation = first_model.diff(second_model, distance='jaccard', num_words=50)
     plot_difference(mdiff, title="Topic difference between models", annotation=annotation)
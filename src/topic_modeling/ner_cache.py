@@ -0,0 +1,63 @@
+import os
+import json
+import sqlite3
+import hashlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NER_CACHE_PATH = f"{BASE_DIR}/../../cache/ner_words.sqlite"
+
+# Connection to the cache in this process
+NER_CACHE = {"connection": None}
+
+
+def get_ner_key(item_url: str, text: str) -> str:
+    """
+    Get the key of the words extracted from an article, which changes whenever its content does
+    :param item_url: url of the article
+    :param text: english content of the article
+    :return: key of the words in the cache
+    """
+    return f"{item_url}#{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+
+def open_ner_cache() -> sqlite3.Connection:
+    """
+    Open the cache of extracted words, creating it if needed, if it was not done yet in this process
+    :return: connection to the cache
+    """
+    if NER_CACHE["connection"] is not None:
+        return NER_CACHE["connection"]
+    os.makedirs(os.path.dirname(NER_CACHE_PATH), exist_ok=True)
+    connection = sqlite3.connect(NER_CACHE_PATH, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS words (key TEXT PRIMARY KEY, words TEXT NOT NULL)")
+    NER_CACHE["connection"] = connection
+    return connection
+
+
+def get_stored_words(keys: list[str]) -> list:
+    """
+    Get the cached words of some articles
+    :param keys: keys of the articles
+    :return: for each article its list of words, or None if it is not cached
+    """
+    connection = open_ner_cache()
+    found = {}
+    unique_keys = list(set(keys))
+    # Stay below the SQLite limit on the number of query parameters
+    for i in range(0, len(unique_keys), 500):
+        chunk = unique_keys[i:i + 500]
+        rows = connection.execute(f"SELECT key, words FROM words WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+        found.update((key, json.loads(words)) for key, words in rows)
+    return [found.get(key) for key in keys]
+
+
+def add_words(words_by_key: dict):
+    """
+    Cache the words extracted from some articles
+    :param words_by_key: dict where keys are the keys of the articles and values are their lists of words
+    """
+    connection = open_ner_cache()
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO words VALUES (?, ?)",
+                               [(key, json.dumps(words)) for key, words in words_by_key.items()])
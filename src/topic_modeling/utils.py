@@ -1,42 +1,47 @@
 import json
 import os
+import sys
 from datetime import datetime
-from enum import Enum
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# The snapshot loading helpers are shared with the scripts in the parent directory
+sys.path.append(f"{BASE_DIR}/..")
+import snapshots
+from snapshots import UseCarousels, iter_lang_items, load_dict_items, load_windows_items
+
 NEWS_DIR = f"{BASE_DIR}/../../data"
 TRANSLATED_NEWS_DIR = f"{BASE_DIR}/../../translated_data"
 
 ORIGINAL_TO_LANG = {"de": "GER", "it": "ITA", "fr": "FRE", "en": "ENG"}
 
 
-class UseCarousels(Enum):
-    YES = 2
-    ONLY = 1
-    NO = 0
-
-
 def date_to_epoch(date: str) -> float:
     date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
     epoch = datetime.utcfromtimestamp(0)
     return (date - epoch).total_seconds()
 
 
-def in_range_epoch(file: str, start_epoch: float, end_epoch: float) -> bool:
+def to_out_date(date: str) -> str:
     """
-    Check if a file is in a given time range
-    :param file: file to be checked
-    :param start_epoch: start of the time range
-    :param end_epoch: end of the time range
-    :return: True if the file is in the time range, False otherwise
+    Format a date for output file names
+    :param date: date in the "%Y-%m-%d %H:%M:%S" format
+    :return: the date with 'T' and '.' as separators
     """
-    file_epoch = int(file.split("E")[1].split(".")[0])
-    return start_epoch <= file_epoch <= end_epoch
+    return date.replace(' ', 'T').replace(':', '.')
 
 
-def get_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch: float, carousels=UseCarousels.YES) \
-        -> list[dict]:
+def get_out_path(window: tuple[str, str]) -> str:
+    """
+    Get the part of the output file names that identifies a time range
+    :param window: starting and ending date of the time range
+    :return: the formatted dates joined by '_'
+    """
+    return f"{to_out_date(window[0])}_{to_out_date(window[1])}"
+
+
+def get_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch: float, carousels=UseCarousels.YES,
+                   fields: tuple = None) -> list[dict]:
     """
     Get all items in a given language section in a given time range
     :param dir_to_check: directory of scraped items
@@ -44,44 +49,37 @@ def get_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch:
     :param start_epoch: start of the time range
     :param end_epoch: end of the time range
     :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
     :return: list of items in lang
     """
-    items = []
-    urls = []
-    for file in os.listdir(f"{dir_to_check}/{lang}"):
-        filepath = f"{dir_to_check}/{lang}/{file}"
-        if in_range_epoch(file, start_epoch, end_epoch):
-            with open(filepath, "r", encoding="utf-8") as f:
-                news = json.load(f)
-                for new in news:
-                    if new["item_url"] not in urls:
-                        if carousels == UseCarousels.NO and new["carousel"]:
-                            continue
-                        if carousels == UseCarousels.ONLY and not new["carousel"]:
-                            continue
-                        urls.append(new["item_url"])
-                        items.append(new)
-    return items
+    return list(iter_lang_items(dir_to_check, lang, start_epoch, end_epoch, carousels, fields))
 
 
-def get_dict_items(start_epoch: float, end_epoch: float, dir_to_check: str = NEWS_DIR, carousels=UseCarousels.YES) \
-        -> dict:
+def get_dict_items(start_epoch: float, end_epoch: float, dir_to_check: str = NEWS_DIR, carousels=UseCarousels.YES,
+                   fields: tuple = None, workers: int = None) -> dict:
     """
     Get all news items grouped by language section in a given time range
     :param start_epoch: start of the time range
     :param end_epoch: end of the time range
     :param dir_to_check: where to look for news items
     :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :param workers: number of processes for loading snapshots, None for using snapshots.LOAD_WORKERS
     :return: List of sections with associated items
     """
+    if workers is None:
+        workers = snapshots.LOAD_WORKERS
+    if workers > 1:
+        return load_dict_items(dir_to_check, os.listdir(dir_to_check), start_epoch, end_epoch, carousels, fields,
+                               workers)
     items = {}
     for lang in os.listdir(dir_to_check):
-        items[lang] = get_lang_items(dir_to_check, lang, start_epoch, end_epoch, carousels = carousels)
+        items[lang] = get_lang_items(dir_to_check, lang, start_epoch, end_epoch, carousels=carousels, fields=fields)
     return items
 
 
 def get_originals_data(start_epoch: float, end_epoch: float, check_dir: str = NEWS_DIR, carousels=UseCarousels.YES,
-                       start_date: str = "", end_date: str = "") -> dict:
+                       start_date: str = "", end_date: str = "", items: dict = None) -> dict:
     """
     Get a dict of items grouped by original news language
     :param start_epoch: the starting time of the time range
@@ -90,9 +88,11 @@ def get_originals_data(start_epoch: float, end_epoch: float, check_dir: str = NE
     :param carousels: how to handle carousels
     :param start_date: starting date for output title
     :param end_date: ending date for output title
+    :param items: items of the time range grouped by language section, if already loaded
     :return: dict where keys are languages and values are news which are originally written in that language
     """
-    items = get_dict_items(start_epoch, end_epoch, check_dir, carousels)
+    if items is None:
+        items = get_dict_items(start_epoch, end_epoch, check_dir, carousels)
     originals = {key: [] for key in items.keys()}
     lens = {key: len(items[key]) for key in items.keys()}
     lens["total"] = sum([lens[key] for key in lens.keys()])
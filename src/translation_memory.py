@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import hashlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MEMORY_PATH = f"{BASE_DIR}/../cache/translation_memory.sqlite"
+
+# Connection to the memory in this process
+MEMORY = {"connection": None}
+
+
+def get_segment_hash(text: str) -> str:
+    """
+    Get the hash of a text segment, which identifies it regardless of the article it comes from
+    :param text: source text of the segment
+    :return: hash of the segment
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def open_memory() -> sqlite3.Connection:
+    """
+    Open the translation memory, creating it if needed, if it was not done yet in this process
+    :return: connection to the memory
+    """
+    if MEMORY["connection"] is not None:
+        return MEMORY["connection"]
+    os.makedirs(os.path.dirname(MEMORY_PATH), exist_ok=True)
+    connection = sqlite3.connect(MEMORY_PATH, timeout=60)
+    # WAL lets several translating processes read while one of them writes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS segments (engine TEXT NOT NULL, lang TEXT NOT NULL, "
+                       "hash TEXT NOT NULL, translation TEXT NOT NULL, PRIMARY KEY (engine, lang, hash))")
+    MEMORY["connection"] = connection
+    return connection
+
+
+def lookup_segments(engine: str, lang: str, texts: list[str]) -> list:
+    """
+    Get the stored translations of some segments
+    :param engine: translation engine the translations must come from
+    :param lang: source language of the segments
+    :param texts: source texts of the segments, None texts are skipped
+    :return: for each segment its translation, or None if it was never translated
+    """
+    connection = open_memory()
+    hashes = [get_segment_hash(text) if text is not None else None for text in texts]
+    found = {}
+    # Stay below the SQLite limit on the number of query parameters
+    unique_hashes = list(set(hashes) - {None})
+    for i in range(0, len(unique_hashes), 500):
+        chunk = unique_hashes[i:i + 500]
+        rows = connection.execute(f"SELECT hash, translation FROM segments WHERE engine = ? AND lang = ? "
+                                  f"AND hash IN ({','.join('?' * len(chunk))})", [engine, lang, *chunk])
+        found.update(rows)
+    return [found.get(segment_hash) for segment_hash in hashes]
+
+
+def store_segments(engine: str, lang: str, texts: list[str], translations: list[str]):
+    """
+    Store the translations of some segments
+    :param engine: translation engine the translations come from
+    :param lang: source language of the segments
+    :param texts: source texts of the segments
+    :param translations: translation of each segment
+    """
+    connection = open_memory()
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?)",
+                               [(engine, lang, get_segment_hash(text), translation)
+                                for text, translation in zip(texts, translations)])
+
+
+def translate_segments(engine: str, lang: str, texts: list[str], translate_fun) -> list:
+    """
+    Translate some segments, calling the engine only for the ones never translated before
+    :param engine: name of the translation engine
+    :param lang: source language of the segments
+    :param texts: source texts of the segments, None texts are skipped
+    :param translate_fun: function translating one text with the engine
+    :return: for each segment its translation, or None if the engine failed on it
+    """
+    translations = lookup_segments(engine, lang, texts)
+    new_translations = {}
+    for i, (text, translation) in enumerate(zip(texts, translations)):
+        if translation is not None or text is None:
+            continue
+        if text not in new_translations:
+            try:
+                new_translations[text] = translate_fun(text)
+            except Exception:
+                new_translations[text] = None
+        translations[i] = new_translations[text]
+    new_translations = {text: translation for text, translation in new_translations.items() if translation is not None}
+    store_segments(engine, lang, list(new_translations.keys()), list(new_translations.values()))
+    return translations
@@ -1,12 +1,18 @@
 import os
 import json
-from argostranslate import translate
-from googletrans import Translator
+import hashlib
+import argparse
+from models import get_model
+from translation_memory import translate_segments, lookup_segments, store_segments
+import argos_engine
+import async_translator
+from snapshots import get_window_files
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NEWS_DIR = f"{BASE_DIR}/../../SwissScrape/scraped_items"
 
 OUT_DIR = f"{BASE_DIR}/../translated_data"
+MANIFEST_PATH = f"{BASE_DIR}/../cache/translation_manifest.json"
 
 LANG_TO_TRANS = {'fre': 0,
                  'ger': 1,
@@ -16,9 +22,19 @@ TO_GOOGLE_LANG = {'fre': 'fr',
                   'ger': 'de',
                   'ita': 'it'}
 
-ALREADY_TRANSLATED = {}
+# Translate with a batched backend, many snapshots at a time, instead of one item at a time
+BATCHED_ENGINE = True
+SNAPSHOTS_PER_BATCH = 100
+
+# Batched backends by name, each translating a list of texts of one language to english. The name of the backend
+# is also the engine its translations are stored under in the translation memory
+BACKENDS = {"argos": argos_engine.translate_texts,
+            "google": async_translator.translate_texts}
+BACKEND = "argos"
+
 
 def setup_translators():
+    from argostranslate import translate
     translators_to_ret = [{} for _ in range(len(LANG_TO_TRANS.keys()))]
     installed_languages = translate.get_installed_languages()
     for i in range(1, len(translators_to_ret) + 1):
@@ -26,13 +42,11 @@ def setup_translators():
     return translators_to_ret
 
 
-translators = setup_translators()
-
-google_translator = Translator()
-
-
 def main():
-    translate_all()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--since", action="store_true",
+                        help="translate only the snapshots newer than the last translated one")
+    translate_all(parser.parse_args().since)
 
 
 def get_one_snap(dir_to_get: str) -> list[dict]:
@@ -57,84 +71,275 @@ def translate_one_snap(snapshot: list[dict]) -> list[dict]:
 
 
 def translate_one_item_argos(item: dict) -> dict:
-    if item["lang"] == "eng":
-        item["en_title"] = item["title"]
-        item["en_content"] = '\n'.join(item["content"])
-        item["en_subtitle"] = item["subtitle"]
-    else:
-        if item["item_url"] in ALREADY_TRANSLATED.keys():
-            item["en_title"] = ALREADY_TRANSLATED[item["item_url"]]["en_title"]
-            item["en_content"] = ALREADY_TRANSLATED[item["item_url"]]["en_content"]
-            item["en_subtitle"] = ALREADY_TRANSLATED[item["item_url"]]["en_subtitle"]
-            return item
-        else:
-            try:
-                item["en_title"] = translators[LANG_TO_TRANS[item["lang"]]].translate(item["title"])
-                item["en_content"] = translators[LANG_TO_TRANS[item["lang"]]].translate('\n'.join(item["content"]))
-            except:
-                pass
-            try:
-                item["en_subtitle"] = translators[LANG_TO_TRANS[item["lang"]]].translate(item["subtitle"])
-            except:
-                item["en_subtitle"] = item["subtitle"]
-            try:
-                ALREADY_TRANSLATED[item["item_url"]] = {"en_title": item["en_title"], "en_content": item["en_content"],
-                                                          "en_subtitle": item["en_subtitle"]}
-            except:
-                ALREADY_TRANSLATED[item["item_url"]] = {"en_title": "", "en_content": "", "en_subtitle": ""}
-
-    return item
+    return translate_one_item(item, "argos", lambda text: get_model("argos")[LANG_TO_TRANS[item["lang"]]].translate(text))
 
 
 def translate_one_item_google(item: dict) -> dict:
+    return translate_one_item(item, "google",
+                              lambda text: get_model("google").translate(text, src=TO_GOOGLE_LANG[item["lang"]],
+                                                                       dest="en").text)
+
+
+def translate_one_item(item: dict, engine: str, translate_fun) -> dict:
+    """
+    Add the english title, content and subtitle to one item, going through the translation memory so that the
+    engine is called only for text never translated before
+    :param item: item to be translated
+    :param engine: name of the translation engine
+    :param translate_fun: function translating one text from the item language to english with the engine
+    :return: the translated item
+    """
     if item["lang"] == "eng":
-        item["en_title"] = item["title"]
-        item["en_content"] = '\n'.join(item["content"])
-        item["en_subtitle"] = item["subtitle"]
-    else:
-        if item["item_url"] in ALREADY_TRANSLATED.keys():
-            item["en_title"] = ALREADY_TRANSLATED[item["item_url"]]["en_title"]
-            item["en_content"] = ALREADY_TRANSLATED[item["item_url"]]["en_content"]
-            item["en_subtitle"] = ALREADY_TRANSLATED[item["item_url"]]["en_subtitle"]
-            return item
-        else:
-            try:
-                item["en_title"] = google_translator.translate(item["title"], src=TO_GOOGLE_LANG[item["lang"]], dest="en")
-                item["en_content"] = google_translator.translate('\n'.join(item["content"]), src=TO_GOOGLE_LANG[item["lang"]], dest="en")
-            except:
-                pass
-            try:
-                item["en_subtitle"] = google_translator.translate(item["subtitle"], src=TO_GOOGLE_LANG[item["lang"]], dest="en")
-            except:
-                item["en_subtitle"] = item["subtitle"]
-            ALREADY_TRANSLATED[item["item_url"]] = {"en_title": item["en_title"], "en_content": item["en_content"],
-                                                    "en_subtitle": item["en_subtitle"]}
+        return set_item_translations(item, get_item_segments(item))
+    return set_item_translations(item, translate_segments(engine, item["lang"], get_item_segments(item),
+                                                          translate_fun))
+
+
+def get_item_segments(item: dict) -> list:
+    """
+    Get the texts of an item that are translated separately. Paragraphs are translated one by one, so that
+    boilerplate paragraphs and the unchanged paragraphs of updated articles are found in the translation memory
+    :param item: item to be translated
+    :return: title, subtitle and each paragraph of the content of the item
+    """
+    return [item["title"], item["subtitle"], *item["content"]]
+
+
+def set_item_translations(item: dict, translations: list) -> dict:
+    """
+    Add the translated texts to an item, keeping the original subtitle if it could not be translated. The content
+    is reassembled from its paragraphs, and it is left out if any of them could not be translated
+    :param item: item to be translated
+    :param translations: translation of each segment of the item, None for the failed ones
+    :return: the translated item
+    """
+    en_title, en_subtitle, *en_paragraphs = translations
+    if en_title is not None:
+        item["en_title"] = en_title
+    if None not in en_paragraphs:
+        item["en_content"] = '\n'.join(en_paragraphs)
+    item["en_subtitle"] = en_subtitle if en_subtitle is not None else item["subtitle"]
     return item
 
 
+def translate_snaps_batched(snapshots: list[list[dict]], backend: str = None) -> list[list[dict]]:
+    """
+    Translate several snapshots with a batched backend, collecting the segments never translated before of
+    all their items and translating each of them once
+    :param snapshots: snapshots to be translated
+    :param backend: name of the backend in BACKENDS, BACKEND if not given
+    :return: the translated snapshots
+    """
+    if backend is None:
+        backend = BACKEND
+    items_by_lang = {}
+    for snapshot in snapshots:
+        if len(snapshot) == 0 or "en_title" in snapshot[0]:
+            continue
+        for item in snapshot:
+            items_by_lang.setdefault(item["lang"], []).append(item)
+
+    for lang, items in items_by_lang.items():
+        if lang == "eng":
+            for item in items:
+                set_item_translations(item, get_item_segments(item))
+            continue
+        segments = [segment for item in items for segment in get_item_segments(item)]
+        translations = lookup_segments(backend, lang, segments)
+        new_segments = list({segment: None for segment, translation in zip(segments, translations)
+                             if translation is None and segment is not None})
+        if new_segments:
+            new_translations = dict(zip(new_segments, BACKENDS[backend](lang, new_segments)))
+            new_translations = {segment: translation for segment, translation in new_translations.items()
+                                if translation is not None}
+            store_segments(backend, lang, list(new_translations.keys()), list(new_translations.values()))
+            translations = [translation if translation is not None else new_translations.get(segment)
+                            for segment, translation in zip(segments, translations)]
+        start = 0
+        for item in items:
+            end = start + 2 + len(item["content"])
+            set_item_translations(item, translations[start:end])
+            start = end
+    return snapshots
+
+
 def full_pipe_one_snap(snap_dir: str) -> list[dict]:
     snap = get_one_snap(snap_dir)
     return translate_one_snap(snap)
 
 
-def translate_all():
+def translate_all(since: bool = False):
+    """
+    Translate all the snapshots not translated yet, resuming from where the last run stopped
+    :param since: translate only the snapshots newer than the last translated one of each language
+    """
+    manifest = load_manifest()
     for language in os.listdir(NEWS_DIR):
         if language == "SPA":
             continue
-        global ALREADY_TRANSLATED
-        ALREADY_TRANSLATED = {}
         print(language)
-        for file in os.listdir(f"{NEWS_DIR}/{language}"):
-            check_dir = os.listdir(f"{OUT_DIR}/{language}")
-            if file.endswith(".json"):
-                if file in check_dir:
-                    # print("Already Found")
-                    continue
-                snap_dir = f"{NEWS_DIR}/{language}/{file}"
-                translated_snap = full_pipe_one_snap(snap_dir)
-                with open(f"{OUT_DIR}/{language}/{file}", "w", encoding="utf-8") as f:
-                    json.dump(translated_snap, f, indent=4)
-                    f.write("\n")
+        translate_language(language, manifest, since)
+        # The processes translating a language are not needed by the following ones
+        argos_engine.close_executors()
+
+
+def load_manifest() -> dict:
+    """
+    Load the translation manifest, or an empty one if it does not exist yet
+    :return: for each language, the epoch of its last translated snapshot and the status, source mtime and
+    checksum of each of its snapshots
+    """
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path: str, data):
+    """
+    Write a JSON file atomically, so that a crash never leaves a partial file behind
+    :param path: path of the file
+    :param data: content of the file
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def get_checksum(filepath: str) -> str:
+    """
+    Get the checksum of a file
+    :param filepath: path of the file
+    :return: sha1 of the file content
+    """
+    with open(filepath, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def is_valid_output(filepath: str) -> bool:
+    """
+    Check whether a translated snapshot written before the manifest existed is complete
+    :param filepath: path of the translated snapshot
+    :return: whether it exists and is valid JSON
+    """
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            json.load(f)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def is_translated(language_manifest: dict, file: str, filepath: str) -> bool:
+    """
+    Check whether a snapshot was already translated from its current content. The source is stat-ed here rather
+    than trusting the catalog, which is only relisted when the directory changes and so misses in-place edits. The
+    checksum is computed only when the source mtime changed
+    :param language_manifest: manifest of the snapshot language
+    :param file: name of the snapshot
+    :param filepath: path of the source snapshot
+    :return: whether the snapshot is up to date
+    """
+    entry = language_manifest["files"].get(file)
+    if entry is None or entry["status"] != "done":
+        return False
+    mtime = os.stat(filepath).st_mtime
+    if entry["mtime"] == mtime:
+        return True
+    if entry["checksum"] != get_checksum(filepath):
+        return False
+    entry["mtime"] = mtime
+    return True
+
+
+def set_status(language_manifest: dict, files: list[tuple], status: str):
+    """
+    Record the status of some snapshots in the manifest of their language. A snapshot marked done keeps the mtime
+    and checksum it had when it was marked pending, so that an edit made while it was being translated is picked
+    up by the next run
+    :param language_manifest: manifest of the snapshots language
+    :param files: entries (epoch, filepath, size, mtime) of the snapshots
+    :param status: "pending" before translating them, "done" after their translation is written
+    """
+    for epoch, filepath, size, _ in files:
+        file = os.path.basename(filepath)
+        entry = language_manifest["files"].get(file)
+        if status == "done" and entry is not None and entry["status"] == "pending":
+            mtime, checksum = entry["mtime"], entry["checksum"]
+        else:
+            # The mtime is read before the checksum, so a concurrent edit makes them disagree and is checked again
+            mtime = os.stat(filepath).st_mtime
+            checksum = get_checksum(filepath)
+        language_manifest["files"][file] = {"status": status, "mtime": mtime, "checksum": checksum}
+        if status == "done" and (language_manifest["checkpoint"] is None or epoch > language_manifest["checkpoint"]):
+            language_manifest["checkpoint"] = epoch
+
+
+def save_manifest(manifest: dict):
+    """
+    Persist the translation manifest atomically
+    :param manifest: manifest to be saved
+    """
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def get_pending_files(language: str, language_manifest: dict, since: bool) -> list[tuple]:
+    """
+    Get the snapshots of a language that still need to be translated
+    :param language: language section
+    :param language_manifest: manifest of the language
+    :param since: consider only the snapshots newer than the last translated one
+    :return: entries (epoch, filepath, size, mtime) of the snapshots to be translated, sorted by epoch
+    """
+    start_epoch = language_manifest["checkpoint"] + 1 if since and language_manifest["checkpoint"] is not None \
+        else float("-inf")
+    files = get_window_files(NEWS_DIR, language, start_epoch, float("inf"))
+
+    # Outputs written before the manifest existed are adopted once, after checking they are complete
+    known = language_manifest["files"]
+    out_files = set(os.listdir(f"{OUT_DIR}/{language}"))
+    adopted = [entry for entry in files if os.path.basename(entry[1]) not in known
+               and os.path.basename(entry[1]) in out_files
+               and is_valid_output(f"{OUT_DIR}/{language}/{os.path.basename(entry[1])}")]
+    set_status(language_manifest, adopted, "done")
+
+    return [entry for entry in files if not is_translated(language_manifest, os.path.basename(entry[1]),
+                                                          entry[1])]
+
+
+def translate_language(language: str, manifest: dict, since: bool = False):
+    """
+    Translate the snapshots of a language that are new or changed since they were translated, many of them at a
+    time with the batched engine. The manifest is saved after every batch, so an interrupted run resumes from the
+    first batch that was not completed
+    :param language: language section to be translated
+    :param manifest: translation manifest, updated in place
+    :param since: translate only the snapshots newer than the last translated one
+    """
+    language_manifest = manifest.setdefault(language, {"checkpoint": None, "files": {}})
+    files = get_pending_files(language, language_manifest, since)
+    save_manifest(manifest)
+    print(f"{len(files)} snapshots to translate")
+
+    batch_size = SNAPSHOTS_PER_BATCH if BATCHED_ENGINE else 1
+    for i in range(0, len(files), batch_size):
+        batch_files = files[i:i + batch_size]
+        set_status(language_manifest, batch_files, "pending")
+        save_manifest(manifest)
+        if BATCHED_ENGINE:
+            snapshots = translate_snaps_batched([get_one_snap(filepath) for _, filepath, _, _ in batch_files])
+        else:
+            snapshots = [full_pipe_one_snap(filepath) for _, filepath, _, _ in batch_files]
+        for (_, filepath, _, _), translated_snap in zip(batch_files, snapshots):
+            write_json(f"{OUT_DIR}/{language}/{os.path.basename(filepath)}", translated_snap)
+        set_status(language_manifest, batch_files, "done")
+        save_manifest(manifest)
 
 
 if __name__ == "__main__":
@@ -1,26 +1,28 @@
 import os
 import json
-import spacy
-from spacy.tokens import Doc
-from typing import Union
+import numpy as np
 from datetime import datetime
-from enum import Enum
-
-SPACY_PROCESSOR = spacy.load("en_core_web_md")
+import snapshots
+from snapshots import UseCarousels, iter_lang_items, load_dict_items, load_windows_variants
+from vector_store import get_vector_key, get_stored_vectors, add_vectors
+from lsh import build_lsh_index, find_similar, lsh_recall
+from lazy_translation import translate_items
+from models import get_model
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NEWS_DIR = f"{BASE_DIR}/../data"
 TRANSLATED_NEWS_DIR = f"{BASE_DIR}/../translated_data"
 
-PROCESSED_CONTENT_FIELD = "cont_nlp"
 SIMILARITY_THRESHOLD = 0.9995
 
-ORIGINAL_TO_LANG = {"de": "GER", "it": "ITA", "fr": "FRE", "en": "ENG"}
+# Approximate neighbours search for SPACY matching, used when a section has at least ANN_MIN_ITEMS items
+USE_ANN = True
+ANN_MIN_ITEMS = 2000
+ANN_TOP_K = 10
+# Number of items checked also by brute force for reporting the recall of the approximate search
+ANN_RECALL_SAMPLE = 200
 
-class UseCarousels(Enum):
-    YES = 2
-    ONLY = 1
-    NO = 0
+ORIGINAL_TO_LANG = {"de": "GER", "it": "ITA", "fr": "FRE", "en": "ENG"}
 
 
 def date_to_epoch(date: str) -> float:
@@ -29,16 +31,22 @@ def date_to_epoch(date: str) -> float:
     return (date - epoch).total_seconds()
 
 
-def in_range_epoch(file: str, start_epoch: float, end_epoch: float) -> bool:
+def to_out_date(date: str) -> str:
     """
-    Check if a file is in a given time range
-    :param file: file to be checked
-    :param start_epoch: start of the time range
-    :param end_epoch: end of the time range
-    :return: True if the file is in the time range, False otherwise
+    Format a date for output file names
+    :param date: date in the "%Y-%m-%d %H:%M:%S" format
+    :return: the date with 'T' and '.' as separators
+    """
+    return date.replace(' ', 'T').replace(':', '.')
+
+
+def get_out_path(window: tuple[str, str]) -> str:
+    """
+    Get the part of the output file names that identifies a time range
+    :param window: starting and ending date of the time range
+    :return: the formatted dates joined by '_'
     """
-    file_epoch = int(file.split("E")[1].split(".")[0])
-    return start_epoch <= file_epoch <= end_epoch
+    return f"{to_out_date(window[0])}_{to_out_date(window[1])}"
 
 
 def get_lang_items(dir_to_check: str, lang: str, carousels=UseCarousels.YES) -> list[dict]:
@@ -66,8 +74,8 @@ def get_lang_items(dir_to_check: str, lang: str, carousels=UseCarousels.YES) ->
     return items
 
 
-def get_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch: float, carousels=UseCarousels.YES) \
-        -> list[dict]:
+def get_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch: float, carousels=UseCarousels.YES,
+                   fields: tuple = None) -> list[dict]:
     """
     Get all items in a given language section in a given time range
     :param dir_to_check: directory of scraped items
@@ -75,24 +83,10 @@ def get_lang_items(dir_to_check: str, lang: str, start_epoch: float, end_epoch:
     :param start_epoch: start of the time range
     :param end_epoch: end of the time range
     :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
     :return: list of items in lang
     """
-    items = []
-    urls = []
-    for file in os.listdir(f"{dir_to_check}/{lang}"):
-        filepath = f"{dir_to_check}/{lang}/{file}"
-        if in_range_epoch(file, start_epoch, end_epoch):
-            with open(filepath, "r", encoding="utf-8") as f:
-                news = json.load(f)
-                for new in news:
-                    if new["item_url"] not in urls:
-                        if carousels == UseCarousels.NO and new["carousel"]:
-                            continue
-                        if carousels == UseCarousels.ONLY and not new["carousel"]:
-                            continue
-                        urls.append(new["item_url"])
-                        items.append(new)
-    return items
+    return list(iter_lang_items(dir_to_check, lang, start_epoch, end_epoch, carousels, fields))
 
 
 def get_all_items(dir_to_check: str = NEWS_DIR) -> list[dict]:
@@ -122,22 +116,43 @@ def get_dict_items(dir_to_check: str = NEWS_DIR, carousels=2) -> dict:
     return items
 
 
-def get_dict_items(start_epoch: float, end_epoch: float, dir_to_check: str = NEWS_DIR, carousels=UseCarousels.YES) \
-        -> dict:
+def get_dict_items(start_epoch: float, end_epoch: float, dir_to_check: str = NEWS_DIR, carousels=UseCarousels.YES,
+                   fields: tuple = None, workers: int = None) -> dict:
     """
     Get all news items grouped by language section in a given time range
     :param start_epoch: start of the time range
     :param end_epoch: end of the time range
     :param dir_to_check: where to look for news items
     :param carousels: how to handle carousels
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :param workers: number of processes for loading snapshots, None for using snapshots.LOAD_WORKERS
     :return: List of sections with associated items
     """
+    if workers is None:
+        workers = snapshots.LOAD_WORKERS
+    if workers > 1:
+        return load_dict_items(dir_to_check, os.listdir(dir_to_check), start_epoch, end_epoch, carousels, fields,
+                               workers)
     items = {}
     for lang in os.listdir(dir_to_check):
-        items[lang] = get_lang_items(dir_to_check, lang, start_epoch, end_epoch, carousels = carousels)
+        items[lang] = get_lang_items(dir_to_check, lang, start_epoch, end_epoch, carousels=carousels, fields=fields)
     return items
 
 
+def get_dict_items_variants(start_epoch: float, end_epoch: float, dir_to_check: str = NEWS_DIR,
+                            fields: tuple = None) -> dict:
+    """
+    Get all news items grouped by language section in a given time range for every way of handling carousels,
+    loading them only once
+    :param start_epoch: start of the time range
+    :param end_epoch: end of the time range
+    :param dir_to_check: where to look for news items
+    :param fields: fields to be kept for each item, None for keeping the whole item
+    :return: dict where keys are the ways of handling carousels and values are what get_dict_items would return
+    """
+    return load_windows_variants(dir_to_check, os.listdir(dir_to_check), [(start_epoch, end_epoch)], fields)[0]
+
+
 def get_item_translations(item: dict) -> list[dict]:
     """
     Get all translations of a news item
@@ -174,34 +189,96 @@ def get_all_translations(news_items: dict) -> dict:
     return translations
 
 
+def get_link_index(news_snapshot: list[dict]) -> dict[str, str]:
+    """
+    Map every item url and translation url of a snapshot to the url of the item it belongs to.
+    When an url is shared by more items, the first one in the snapshot is kept
+    """
+    link_index = {}
+    for article in news_snapshot:
+        link_index.setdefault(article["item_url"], article["item_url"])
+        for translation in get_item_translations(article):
+            link_index.setdefault(translation, article["item_url"])
+    return link_index
+
+
+def get_link_indexes(news_items: dict) -> dict[str, dict[str, str]]:
+    """
+    Build the link index of each language section
+    :param news_items: dict where keys are languages and values are their items
+    :return: dict where keys are languages and values are their link indexes
+    """
+    return {lang: get_link_index(items) for lang, items in news_items.items()}
+
+
+def find_linked_equivalent(main_news: dict, link_index: dict[str, str]) -> tuple[bool, str]:
+    """
+    Check if a news item has an equivalent in a snapshot given the link index of the snapshot
+    """
+    true_url = link_index.get(main_news["item_url"])
+    if true_url is None:
+        return False, ""
+    return True, true_url
+
+
 def has_equivalent_in_snapshot_linked(main_news: dict, news_snapshot: list[dict], simil_cache: dict = None) \
         -> tuple[bool, str]:
     """
     Check if a news item has an equivalent in a snapshot using translations links of Swissinfo
     """
-    translations, true_urls = get_snapshot_translation(news_snapshot)
-    for translation, true_url in zip(translations, true_urls):
-        if translation == main_news["item_url"]:
-            return True, true_url
-    return False, ""
+    return find_linked_equivalent(main_news, get_link_index(news_snapshot))
 
 
-def process_content(to_process: list[str]) -> Union[Doc, Doc]:
+def get_plain_content(to_process: list[str]) -> str:
     """
-    Process the content of a news item with SpaCy
+    Get the text that is processed with SpaCy for the content of a news item
     """
-    plain_content = "\n".join(to_process)
-    return SPACY_PROCESSOR(plain_content)
+    return "\n".join(to_process)
 
 
-def are_similar(news_A: dict, news_B: dict) -> bool:
+def get_content_vectors(items: list[dict], batch_size: int = 64) -> list:
     """
-    Compute similarity rate between two items using Spacy
-    :param news_A
-    :param news_B
+    Get the normalized SpaCy document vectors of the content of the items from the vector store.
+    Contents never seen before are processed in batches with nlp.pipe and without pipeline components, since
+    document vectors only depend on the static word vectors, and added to the store
+    :param items: items to be vectorized
+    :param batch_size: number of contents processed together
+    :return: for each item its vector, or None if the item has no english content
+    """
+    translate_items(items)
+    keys = []
+    for item in items:
+        if isinstance(item.get("en_content"), (str, list)):
+            keys.append(get_vector_key(item["item_url"], get_plain_content(item["en_content"])))
+        else:
+            keys.append(None)
+    vectors = get_stored_vectors(keys)
+
+    to_process = {}
+    for item, key, vector in zip(items, keys, vectors):
+        if key is not None and vector is None:
+            to_process[key] = get_plain_content(item["en_content"])
+    if to_process:
+        nlp = get_model("spacy_md")
+        docs = nlp.pipe(to_process.values(), batch_size=batch_size, disable=nlp.pipe_names)
+        new_vectors = []
+        for doc in docs:
+            vector = np.asarray(doc.vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            new_vectors.append(vector / norm if norm > 0 else vector)
+        add_vectors(list(to_process.keys()), np.stack(new_vectors))
+        vectors = get_stored_vectors(keys)
+    return vectors
+
+
+def are_similar(vector_A: np.ndarray, vector_B: np.ndarray) -> bool:
+    """
+    Compute similarity rate between two items using their normalized SpaCy document vectors
+    :param vector_A
+    :param vector_B
     :return: True if the similarity is above between threshold, False otherwise
     """
-    similarity = news_A[PROCESSED_CONTENT_FIELD].similarity(news_B[PROCESSED_CONTENT_FIELD])
+    similarity = float(np.dot(vector_A, vector_B))
     return similarity > SIMILARITY_THRESHOLD
 
 
@@ -216,12 +293,11 @@ def has_equivalent_in_snapshot_spacy(main_news: dict, news_snapshot: list[dict],
     """
     if simil_cache is None:
         simil_cache = {}
-    if PROCESSED_CONTENT_FIELD not in main_news:
-        try:
-            main_news[PROCESSED_CONTENT_FIELD] = process_content(main_news["en_content"])
-        except:
-            return False, ""
-    for news_item in news_snapshot:
+    main_vector = get_content_vectors([main_news])[0]
+    if main_vector is None:
+        return False, ""
+    snapshot_vectors = None
+    for i, news_item in enumerate(news_snapshot):
         if main_news["en_title"] is not None and news_item["en_title"] is not None:
             title_1 = max(main_news["en_title"], news_item["en_title"])
             title_2 = min(main_news["en_title"], news_item["en_title"])
@@ -232,18 +308,63 @@ def has_equivalent_in_snapshot_spacy(main_news: dict, news_snapshot: list[dict],
             elif idx in simil_cache and simil_cache[idx] is False:
                 continue
 
-            if PROCESSED_CONTENT_FIELD not in news_item:
-                news_item[PROCESSED_CONTENT_FIELD] = process_content(news_item["en_content"])
+            if snapshot_vectors is None:
+                snapshot_vectors = get_content_vectors(news_snapshot)
 
-            if are_similar(main_news, news_item):
+            if snapshot_vectors[i] is not None and are_similar(main_vector, snapshot_vectors[i]):
                 simil_cache[idx] = True
                 return True, news_item["item_url"]
             simil_cache[idx] = False
     return False, ""
 
 
+def get_vectors_matrix(items: list[dict], vectors: list) -> tuple[np.ndarray, list[int]]:
+    """
+    Stack the content vectors of the items that can be compared, the ones with both a title and a content
+    :param items: items to be compared
+    :param vectors: content vectors of the items
+    :return: matrix with one row for each comparable item and positions of those items in the list
+    """
+    positions = [i for i, item in enumerate(items) if item.get("en_title") is not None and vectors[i] is not None]
+    if not positions:
+        return np.zeros((0, 0), dtype=np.float32), positions
+    return np.stack([vectors[i] for i in positions]), positions
+
+
+def find_spacy_equivalents(main_items: list[dict], news_snapshot: list[dict]) -> list[tuple[bool, str]]:
+    """
+    Batched version of has_equivalent_in_snapshot_spacy: check every item of main_items against a snapshot
+    computing all the cosine similarities between the two sets with a single matrix product
+    :param main_items: items to be checked
+    :param news_snapshot: snapshot to check in
+    :return: for each item in main_items, True and the url of the first equivalent item in news_snapshot if there
+    is one, False and an empty string otherwise
+    """
+    equivalents = [(False, "") for _ in main_items]
+    main_matrix, main_positions = get_vectors_matrix(main_items, get_content_vectors(main_items))
+    other_matrix, other_positions = get_vectors_matrix(news_snapshot, get_content_vectors(news_snapshot))
+    if not main_positions or not other_positions:
+        return equivalents
+
+    if USE_ANN and len(other_positions) >= ANN_MIN_ITEMS:
+        index = build_lsh_index(other_matrix)
+        sample = np.random.default_rng(0).permutation(len(main_positions))[:ANN_RECALL_SAMPLE]
+        recall = lsh_recall(index, main_matrix[sample], SIMILARITY_THRESHOLD, ANN_TOP_K)
+        print(f"LSH recall against brute force on {len(sample)} items: {recall:.3f}")
+        first_similar = np.array(find_similar(index, main_matrix, SIMILARITY_THRESHOLD, ANN_TOP_K))
+        has_similar = first_similar >= 0
+    else:
+        similar = (main_matrix @ other_matrix.T) > SIMILARITY_THRESHOLD
+        has_similar = similar.any(axis=1)
+        first_similar = similar.argmax(axis=1)
+    for row, main_position in enumerate(main_positions):
+        if has_similar[row]:
+            equivalents[main_position] = (True, news_snapshot[other_positions[first_similar[row]]]["item_url"])
+    return equivalents
+
+
 def get_originals_data(start_epoch: float, end_epoch: float, check_dir: str = NEWS_DIR, carousels=UseCarousels.YES,
-                       start_date: str = "", end_date: str = "") -> dict:
+                       start_date: str = "", end_date: str = "", items: dict = None) -> dict:
     """
     Get a dict of items grouped by original news language
     :param start_epoch: the starting time of the time range
@@ -252,9 +373,11 @@ def get_originals_data(start_epoch: float, end_epoch: float, check_dir: str = NE
     :param carousels: how to handle carousels
     :param start_date: starting date for output title
     :param end_date: ending date for output title
+    :param items: items of the time range grouped by language section, if already loaded
     :return: dict where keys are languages and values are news which are originally written in that language
     """
-    items = get_dict_items(start_epoch, end_epoch, check_dir, carousels)
+    if items is None:
+        items = get_dict_items(start_epoch, end_epoch, check_dir, carousels)
     originals = {key: [] for key in items.keys()}
     lens = {key: len(items[key]) for key in items.keys()}
     lens["total"] = sum([lens[key] for key in lens.keys()])
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VECTOR_STORE_DIR = f"{BASE_DIR}/../cache/vectors"
+VECTORS_PATH = f"{VECTOR_STORE_DIR}/vectors.f32"
+INDEX_PATH = f"{VECTOR_STORE_DIR}/index.json"
+LOCK_PATH = f"{VECTOR_STORE_DIR}/lock"
+
+# Seconds between attempts to take the lock of the store, and after which a lock is assumed to be left by a crashed
+# process
+LOCK_RETRY = 0.05
+LOCK_TIMEOUT = 600
+
+# State of the store in this process: rows of the stored vectors by key and the memory-mapped vectors
+STORE = {"dim": None, "rows": None, "vectors": None}
+
+
+def get_vector_key(item_url: str, text: str) -> str:
+    """
+    Get the key of a document vector, which changes whenever the processed text does
+    :param item_url: url of the item the text belongs to
+    :param text: processed text
+    :return: key of the vector in the store
+    """
+    return f"{item_url}#{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+
+@contextmanager
+def lock_store():
+    """
+    Hold the lock of the store, so that a single process at a time appends vectors to it. The lock is a file created
+    exclusively, which works the same on every platform
+    """
+    while True:
+        try:
+            fd = os.open(LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(LOCK_PATH) > LOCK_TIMEOUT:
+                    os.remove(LOCK_PATH)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(LOCK_RETRY)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(LOCK_PATH)
+
+
+def read_index() -> dict:
+    """
+    Read the index of the store from disk
+    :return: dict with the vectors dimension and the row of each stored key
+    """
+    if not os.path.exists(INDEX_PATH):
+        return {"dim": None, "rows": {}}
+    with open(INDEX_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def map_vectors():
+    """
+    Memory-map the vectors file with its current number of rows
+    """
+    if STORE["dim"] is None or not os.path.exists(VECTORS_PATH):
+        STORE["vectors"] = None
+        return
+    n_rows = os.path.getsize(VECTORS_PATH) // (STORE["dim"] * 4)
+    if n_rows == 0:
+        STORE["vectors"] = None
+        return
+    STORE["vectors"] = np.memmap(VECTORS_PATH, dtype=np.float32, mode="r", shape=(n_rows, STORE["dim"]))
+
+
+def open_store():
+    """
+    Load the index of the store and map its vectors, if it was not done yet in this process
+    """
+    if STORE["rows"] is not None:
+        return
+    index = read_index()
+    STORE["dim"] = index["dim"]
+    STORE["rows"] = index["rows"]
+    map_vectors()
+
+
+def get_stored_vectors(keys: list[str]) -> list:
+    """
+    Get the stored vectors of some keys
+    :param keys: keys of the vectors, None keys are skipped
+    :return: for each key its vector, or None if it is not stored
+    """
+    open_store()
+    vectors = []
+    for key in keys:
+        row = STORE["rows"].get(key) if key is not None else None
+        if row is None or STORE["vectors"] is None or row >= len(STORE["vectors"]):
+            vectors.append(None)
+        else:
+            vectors.append(STORE["vectors"][row])
+    return vectors
+
+
+def add_vectors(keys: list[str], vectors: np.ndarray):
+    """
+    Append vectors to the store. Vectors are written before the index, so the index never points to missing rows.
+    Many processes can append to the store: each one takes its lock and reads the index and the size of the vectors
+    file again, so its rows follow the ones written by the others and their keys are kept
+    :param keys: keys of the vectors
+    :param vectors: matrix with one vector for each key
+    """
+    if not keys:
+        return
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+    with lock_store():
+        index = read_index()
+        if index["dim"] is None:
+            index["dim"] = vectors.shape[1]
+        row_size = index["dim"] * 4
+        size = os.path.getsize(VECTORS_PATH) if os.path.exists(VECTORS_PATH) else 0
+        # A partial row left by a process that crashed while writing is padded, so the new rows stay aligned
+        first_row = -(-size // row_size)
+        with open(VECTORS_PATH, "ab") as f:
+            f.write(bytes(first_row * row_size - size))
+            f.write(vectors.tobytes())
+
+        for i, key in enumerate(keys):
+            index["rows"][key] = first_row + i
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, INDEX_PATH)
+
+    STORE["dim"] = index["dim"]
+    STORE["rows"] = index["rows"]
+    map_vectors()
@@ -0,0 +1,113 @@
+import os
+import sys
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import utils
+
+# commonality lists the language sections of the translated snapshots when imported, none are needed here
+utils.TRANSLATED_NEWS_DIR = tempfile.mkdtemp()
+import commonality
+
+
+def make_item(lang: str, number: int, translations: dict[str, int]) -> dict:
+    return {"lang": lang, "item_url": f"https://www.swissinfo.ch/{lang}/{number}",
+            "translations": {transl_lang: f"https://www.swissinfo.ch/x/{transl_number}"
+                             for transl_lang, transl_number in translations.items()}}
+
+
+# The italian, english and german items contain each other's ids, the french one only shares the german id with them
+ITEMS = [make_item("ita", 1, {"English": 2}),
+         make_item("eng", 2, {"Italiano": 1, "Deutsch": 3}),
+         make_item("ger", 3, {"English": 2}),
+         make_item("fre", 4, {"Deutsch": 3}),
+         make_item("ita", 9, {})]
+
+
+def get_sizes(unique_articles: dict) -> list[int]:
+    return sorted(len(articles) for articles in unique_articles.values())
+
+
+def test_inclusion_clusters_are_the_default():
+    unique_articles = commonality.get_cardinalities(ITEMS)
+    assert get_sizes(unique_articles) == [1, 1, 3]
+    clusters_by_id = commonality.get_inclusion_index(unique_articles)
+    assert [commonality.get_inclusion_cardinality(item, unique_articles, clusters_by_id)
+            for item in ITEMS] == [3, 3, 3, 1, 1]
+
+
+def test_transitive_clusters_merge_shared_translations():
+    unique_articles = commonality.get_cardinalities(ITEMS, transitive=True)
+    assert get_sizes(unique_articles) == [1, 4]
+    cardinalities = commonality.get_cardinality_index(unique_articles)
+    assert [commonality.get_one_cardinality(item, cardinalities) for item in ITEMS] == [4, 4, 4, 4, 1]
+
+
+def test_transitive_clusters_keep_one_item_per_language():
+    # A second italian item linked to the english one is in its own cluster by inclusion, and dropped by transitivity
+    duplicate = make_item("ita", 5, {"English": 2})
+    assert get_sizes(commonality.get_cardinalities(ITEMS[:3] + [duplicate])) == [1, 3]
+    assert get_sizes(commonality.get_cardinalities(ITEMS[:3] + [duplicate], transitive=True)) == [3]
+
+
+def scan_by_inclusion(news_items: list[dict]) -> dict[frozenset, list[dict]]:
+    # Grouping by inclusion comparing every item with every cluster, as it was done before it was indexed
+    unique_articles = {}
+    for news_item in news_items:
+        already_appended = []
+        article_id = commonality.get_id(news_item)
+        is_found = False
+        for found_id in unique_articles.keys():
+            intersection = article_id.intersection(found_id)
+            if intersection == found_id or intersection == article_id:
+                if intersection == article_id:
+                    article_id = found_id
+                if intersection == found_id:
+                    unique_articles[article_id] = unique_articles.pop(found_id)
+                is_found = True
+                already_appended = [art["item_url"] for art in unique_articles[article_id]]
+                break
+        if not is_found:
+            unique_articles[article_id] = []
+        if news_item["item_url"] not in already_appended:
+            unique_articles[article_id].append(news_item)
+    return unique_articles
+
+
+def scan_cardinality(article: dict, unique_articles: dict[frozenset, list[dict]]):
+    # Cardinality of an article checking every cluster, as it was done before it was indexed
+    for article_id in unique_articles.keys():
+        intersection = commonality.get_id(article).intersection(article_id)
+        if intersection == article_id:
+            return len(unique_articles.get(commonality.get_id(article), unique_articles[article_id]))
+        if intersection == commonality.get_id(article):
+            return len(unique_articles[article_id])
+    return 0
+
+
+def make_random_items(seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    langs = {"ita": "Italiano", "eng": "English", "fre": "Français", "ger": "Deutsch"}
+    items = []
+    for _ in range(300):
+        lang = rng.choice(list(langs.keys()))
+        # Few numbers, so that items share many translations and clusters overlap
+        translations = {langs[transl_lang]: rng.randrange(40) for transl_lang in langs.keys()
+                        if transl_lang != lang and rng.random() < 0.5}
+        items.append(make_item(lang, rng.randrange(40), translations))
+    return items
+
+
+def test_indexed_inclusion_matches_scan():
+    for seed in range(20):
+        items = make_random_items(seed)
+        expected = scan_by_inclusion(items)
+        unique_articles = commonality.group_by_inclusion(items)
+        assert list(unique_articles.keys()) == list(expected.keys())
+        assert list(unique_articles.values()) == list(expected.values())
+
+        unique_articles = commonality.get_cardinalities(items)
+        clusters_by_id = commonality.get_inclusion_index(unique_articles)
+        assert [commonality.get_inclusion_cardinality(item, unique_articles, clusters_by_id) for item in items] == \
+               [scan_cardinality(item, unique_articles) for item in items]